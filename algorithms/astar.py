@@ -0,0 +1,192 @@
+import heapq
+import math
+import weakref
+import numpy as np
+from .dijkstra import rebuild_path
+
+EARTH_RADIUS_KM = 6371.0088
+
+_geo_cache = weakref.WeakKeyDictionary()
+
+
+def haversine_km(lon1, lat1, lon2, lat2):
+    """Great-circle distance in km between two (lon, lat) points in degrees."""
+    lon1, lat1, lon2, lat2 = map(math.radians, (lon1, lat1, lon2, lat2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _haversine_array(lon1, lat1, lon2, lat2):
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+class _Geo:
+    """Per-graph data for the heuristic: node coordinates in radians and one scale factor per metric."""
+
+    def __init__(self, csr):
+        self.lon = np.radians(csr.x).tolist()
+        self.lat = np.radians(csr.y).tolist()
+        self.cos_lat = np.cos(np.radians(csr.y)).tolist()
+
+        # Great-circle length of every arc, used to calibrate the bounds.
+        arc_src = np.repeat(np.arange(csr.num_nodes), np.diff(csr.offsets))
+        arc_km = _haversine_array(csr.x[arc_src], csr.y[arc_src], csr.x[csr.targets], csr.y[csr.targets])
+        self.arc_km = arc_km
+        self.factors = {}
+
+    def factor(self, csr, weight_type, weights=None):
+        """
+        Largest k such that k * great-circle(u, v) <= weight(u, v) on every arc.
+        For `distance` this is ~1 (the great-circle lower bound); for `time`
+        it is 1 / the fastest speed seen on any road, in minutes per km.
+        By the triangle inequality k * great-circle(v, target) is then an
+        admissible and consistent heuristic. `weights`, if given, is a
+        callable returning per-arc lower bounds to calibrate against instead
+        of the metric column (`weight_type` then only names the cache entry).
+        """
+        key = (weight_type, csr.revision)  # recalibrate after edge weight updates
+        if key not in self.factors:
+            weights = weights() if weights is not None else csr.metric_column(weight_type)
+            mask = self.arc_km > 0
+            k = float(np.min(weights[mask] / self.arc_km[mask])) if mask.any() else 0.0
+            # shave a little off so rounding can never make the bound exceed a real cost
+            self.factors[key] = max(0.0, k) * (1 - 1e-9)
+        return self.factors[key]
+
+
+def _geo(csr):
+    geo = _geo_cache.get(csr)
+    if geo is None:
+        geo = _Geo(csr)
+        _geo_cache[csr] = geo
+    return geo
+
+
+def _heuristic(csr, target, weight_type, weights=None):
+    """Return h(v): lower bound on the remaining cost from node v to `target`."""
+    geo = _geo(csr)
+    k = geo.factor(csr, weight_type, weights)
+    lon, lat, cos_lat = geo.lon, geo.lat, geo.cos_lat
+    t_lon, t_lat, t_cos = lon[target], lat[target], cos_lat[target]
+    scale = 2 * EARTH_RADIUS_KM * k
+    sin, asin, sqrt = math.sin, math.asin, math.sqrt
+
+    def h(v):
+        a = sin((t_lat - lat[v]) / 2) ** 2 + cos_lat[v] * t_cos * sin((t_lon - lon[v]) / 2) ** 2
+        return scale * asin(min(1.0, sqrt(a)))
+
+    return h
+
+
+def astar_csr(csr, source, target, weight_type="distance", stats=None):
+    """
+    A* on a CSRGraph with a great-circle lower bound. Returns (cost, id path).
+    If `stats` is a dict, the number of settled nodes is stored under "settled".
+    """
+    offsets = csr.offsets
+    targets = csr.targets
+    column = csr.metric_column(weight_type)
+    h = _heuristic(csr, target, weight_type)
+    inf = float("inf")
+    dist = {source: 0.0}
+    pred = {source: -1}
+    closed = set()
+
+    queue = [(h(source), 0.0, source)]
+    while queue:
+        _, cost, u = heapq.heappop(queue)
+        if u in closed or cost > dist[u]:
+            continue
+        closed.add(u)
+        if u == target:
+            if stats is not None:
+                stats["settled"] = len(closed)
+            return cost, rebuild_path(pred, target, -1)
+
+        lo, hi = offsets[u], offsets[u + 1]
+        for v, w in zip(targets[lo:hi].tolist(), column[lo:hi].tolist()):
+            nd = cost + w
+            if nd < dist.get(v, inf):
+                dist[v] = nd
+                pred[v] = u
+                heapq.heappush(queue, (nd + h(v), nd, v))
+
+    if stats is not None:
+        stats["settled"] = len(closed)
+    return inf, []
+
+
+def bidirectional_astar_csr(csr, source, target, weight_type="distance", stats=None):
+    """
+    Bidirectional A* with average potentials (Goldberg & Harrelson).
+    p(v) = (h_target(v) - h_source(v)) / 2 keeps reduced costs non-negative
+    in both directions, so the usual bidirectional Dijkstra stopping rule
+    (top_forward + top_backward >= best meeting cost) stays exact.
+    Roads are undirected, so the backward search uses the same arcs.
+    Returns (cost, id path); `stats["settled"]` counts both directions.
+    """
+    if source == target:
+        if stats is not None:
+            stats["settled"] = 1
+        return 0.0, [source]
+
+    offsets = csr.offsets
+    targets = csr.targets
+    column = csr.metric_column(weight_type)
+    h_t = _heuristic(csr, target, weight_type)
+    h_s = _heuristic(csr, source, weight_type)
+    inf = float("inf")
+
+    potentials = {}
+
+    def p(v):
+        value = potentials.get(v)
+        if value is None:
+            value = (h_t(v) - h_s(v)) / 2
+            potentials[v] = value
+        return value
+
+    dist = ({source: 0.0}, {target: 0.0})
+    pred = ({source: -1}, {target: -1})
+    closed = (set(), set())
+    sign = (1, -1)  # forward keys use +p, backward keys use -p
+    queues = ([(p(source), source)], [(-p(target), target)])
+    best, meet = inf, -1
+
+    while queues[0] and queues[1]:
+        if queues[0][0][0] + queues[1][0][0] >= best:
+            break
+        side = 0 if queues[0][0][0] <= queues[1][0][0] else 1
+        _, u = heapq.heappop(queues[side])
+        if u in closed[side]:
+            continue
+        closed[side].add(u)
+        d_here, d_other = dist[side], dist[1 - side]
+        cost = d_here[u]
+
+        lo, hi = offsets[u], offsets[u + 1]
+        for v, w in zip(targets[lo:hi].tolist(), column[lo:hi].tolist()):
+            nd = cost + w
+            if nd < d_here.get(v, inf):
+                d_here[v] = nd
+                pred[side][v] = u
+                heapq.heappush(queues[side], (nd + sign[side] * p(v), v))
+                if v in d_other and nd + d_other[v] < best:
+                    best, meet = nd + d_other[v], v
+        if u in d_other and cost + d_other[u] < best:
+            best, meet = cost + d_other[u], u
+
+    if stats is not None:
+        stats["settled"] = len(closed[0]) + len(closed[1])
+    if meet == -1:
+        return inf, []
+
+    path = rebuild_path(pred[0], meet, -1)
+    node = pred[1][meet]
+    while node != -1:
+        path.append(node)
+        node = pred[1][node]
+    # Re-sum along the path so the cost matches plain Dijkstra bit for bit.
+    return csr.path_cost(path, weight_type), path
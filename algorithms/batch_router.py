@@ -0,0 +1,180 @@
+import csv
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from .csr_graph import METRICS
+from .dijkstra import rebuild_path, shortest_path_tree_csr
+from .graph_store import DEFAULT_GRAPH_FILE, get_csr
+
+ORDER_FIELDS = ("order_id", "start", "end", "metric")
+
+_worker = {}
+
+
+def _jsonl_rows(stream):
+    """Yield (row dict, error) per non-blank line; a line that is not a JSON object gives ({}, message)."""
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield {}, f"invalid JSON: {e}"
+            continue
+        if isinstance(row, dict):
+            yield row, None
+        else:
+            yield {}, "order is not a JSON object"
+
+
+def read_orders(stream, fmt="csv", default_metric="distance"):
+    """
+    Yield order dicts (order_id, start, end, metric) one at a time from a
+    CSV stream with a header row or a JSONL stream. Rows without a metric
+    use `default_metric`; rows without an order_id get their line number.
+    Malformed JSONL lines are yielded with an "error" and become error rows.
+    """
+    if fmt == "csv":
+        rows = ((row, None) for row in csv.DictReader(stream))
+    elif fmt == "jsonl":
+        rows = _jsonl_rows(stream)
+    else:
+        raise ValueError(f"Unknown order format '{fmt}', expected 'csv' or 'jsonl'")
+
+    for n, (row, error) in enumerate(rows, start=1):
+        order = {
+            "order_id": row.get("order_id") or n,
+            "start": row.get("start"),
+            "end": row.get("end"),
+            "metric": row.get("metric") or default_metric,
+        }
+        if error:
+            order["error"] = error
+        yield order
+
+
+def _init_worker(graph_file):
+    _worker["csr"] = get_csr(graph_file)
+
+
+def _route_group(job):
+    """
+    Solve every order sharing one (metric, start) with a single
+    shortest-path tree that stops once all their destinations are settled.
+    Returns [(position in chunk, result dict), ...].
+    """
+    metric, start, orders, with_path = job
+    csr = _worker["csr"]
+    s = csr.index[start]
+    ends = {csr.index[order["end"]] for _, order in orders}
+    dist, pred = shortest_path_tree_csr(csr, s, metric, stop_at=ends)
+
+    results = []
+    for pos, order in orders:
+        t = csr.index[order["end"]]
+        cost = dist[t]
+        result = dict(order, cost=cost if cost != float("inf") else None)
+        if with_path:
+            result["path"] = [csr.names[i] for i in rebuild_path(pred, t, -1)] if result["cost"] is not None else []
+        results.append((pos, result))
+    return results
+
+
+def _invalid(order, csr):
+    if order.get("error"):
+        return order["error"]
+    if order["metric"] not in METRICS:
+        return f"unknown metric '{order['metric']}'"
+    for key in ("start", "end"):
+        if not isinstance(order[key], str):
+            return f"'{key}' must be a location name, got {order[key]!r}"
+        if order[key] not in csr.index:
+            return f"unknown location '{order[key]}'"
+    return None
+
+
+def _group_chunk(chunk, csr, with_path):
+    """Split a chunk into per-(metric, start) jobs; invalid orders are answered directly."""
+    groups = {}
+    answered = []
+    for pos, order in enumerate(chunk):
+        error = _invalid(order, csr)
+        if error:
+            answered.append((pos, dict(order, cost=None, error=error)))
+        else:
+            groups.setdefault((order["metric"], order["start"]), []).append((pos, order))
+    jobs = [(metric, start, orders, with_path) for (metric, start), orders in groups.items()]
+    return jobs, answered
+
+
+def route_orders(orders, graph_file=DEFAULT_GRAPH_FILE, workers=1, chunk_size=50_000, with_path=True, stats=None):
+    """
+    Route an iterable of orders and yield results in input order.
+    Orders are consumed `chunk_size` at a time, so memory stays bounded no
+    matter how long the input is. Within a chunk, orders are grouped by
+    (metric, start) and each group costs one shortest-path tree; groups are
+    spread over `workers` processes. Pass a dict as `stats` to get order,
+    group and tree counts back.
+    """
+    csr = get_csr(graph_file)
+    counts = {"orders": 0, "trees": 0, "errors": 0, "unreachable": 0}
+    orders = iter(orders)
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(graph_file,))
+    else:
+        _init_worker(graph_file)
+
+    try:
+        while True:
+            chunk = list(islice(orders, chunk_size))
+            if not chunk:
+                break
+            jobs, answered = _group_chunk(chunk, csr, with_path)
+            if pool is not None:
+                solved = pool.map(_route_group, jobs, chunksize=max(1, len(jobs) // (workers * 4)))
+            else:
+                solved = map(_route_group, jobs)
+
+            results = [None] * len(chunk)
+            for pos, result in answered:
+                results[pos] = result
+            for group in solved:
+                for pos, result in group:
+                    results[pos] = result
+
+            counts["orders"] += len(chunk)
+            counts["trees"] += len(jobs)
+            counts["errors"] += len(answered)
+            counts["unreachable"] += sum(1 for r in results if r["cost"] is None and "error" not in r)
+            yield from results
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if stats is not None:
+            stats.update(counts)
+
+
+def run_batch(input_file, output_file, fmt=None, graph_file=DEFAULT_GRAPH_FILE, workers=1,
+              chunk_size=50_000, with_path=True, default_metric="distance"):
+    """
+    Route an order file into a JSONL result file, one line per order.
+    "-" reads stdin / writes stdout. The input format follows the file
+    extension (.csv or .jsonl) unless `fmt` is given.
+    """
+    if fmt is None:
+        fmt = "jsonl" if input_file.endswith((".jsonl", ".json")) else "csv"
+    src = sys.stdin if input_file == "-" else open(input_file, "r", newline="")
+    dst = sys.stdout if output_file == "-" else open(output_file, "w")
+    stats = {}
+    try:
+        orders = read_orders(src, fmt, default_metric)
+        for result in route_orders(orders, graph_file, workers, chunk_size, with_path, stats):
+            dst.write(json.dumps(result) + "\n")
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+    return stats
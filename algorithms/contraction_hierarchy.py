@@ -0,0 +1,405 @@
+import heapq
+import math
+import os
+import random
+import numpy as np
+from .astar import bidirectional_astar_csr
+from .csr_graph import METRICS
+from .dijkstra import dijkstra_csr
+from .graph_store import DEFAULT_GRAPH_FILE, get_store, store_for
+from utils import instrumentation
+
+WITNESS_SETTLE_LIMIT = 100
+WITNESS_HOP_LIMIT = 5
+CORE_DEGREE = 12  # stop contracting once the remaining graph averages this many roads per node
+
+
+class ContractionHierarchy:
+    """
+    Contraction hierarchy for one metric of a CSRGraph.
+    `rank[v]` is the contraction order. The upward graph keeps, for every node,
+    the arcs to higher-ranked nodes (original roads and shortcuts) in CSR
+    form; `up_mid` is the contracted middle node of a shortcut, or -1 for an
+    original road. Roads are undirected, so one upward graph serves both
+    search directions. The `core_size` highest-ranked nodes were left
+    uncontracted; they keep all their arcs to each other, in both
+    directions, and the query searches the core as a plain graph.
+    """
+
+    def __init__(self, weight_type, rank, up_offsets, up_targets, up_weights, up_mid, source_mtime=None,
+                 core_size=0):
+        self.weight_type = weight_type
+        self.rank = rank
+        self.up_offsets = up_offsets
+        self.up_targets = up_targets
+        self.up_weights = up_weights
+        self.up_mid = up_mid
+        self.source_mtime = source_mtime
+        self.core_size = core_size
+        self.revision = 0  # CSRGraph.revision of the weights it was built from
+        self._lists = None
+
+    @property
+    def num_shortcuts(self):
+        return int(np.count_nonzero(self.up_mid >= 0))
+
+    def _as_lists(self):
+        # Python lists are much faster than NumPy scalars in the query loop.
+        if self._lists is None:
+            self._lists = (
+                self.up_offsets.tolist(),
+                self.up_targets.tolist(),
+                self.up_weights.tolist(),
+                self.up_mid.tolist(),
+                self.rank.tolist(),
+            )
+        return self._lists
+
+    def save(self, filename):
+        np.savez(
+            filename,
+            weight_type=np.array(self.weight_type),
+            rank=self.rank,
+            up_offsets=self.up_offsets,
+            up_targets=self.up_targets,
+            up_weights=self.up_weights,
+            up_mid=self.up_mid,
+            source_mtime=np.array(-1 if self.source_mtime is None else self.source_mtime, dtype=np.int64),
+            core_size=np.array(self.core_size, dtype=np.int64),
+        )
+
+    @classmethod
+    def load(cls, filename):
+        with np.load(filename) as data:
+            mtime = int(data["source_mtime"])
+            return cls(
+                str(data["weight_type"]),
+                data["rank"],
+                data["up_offsets"],
+                data["up_targets"],
+                data["up_weights"],
+                data["up_mid"],
+                None if mtime == -1 else mtime,
+                int(data["core_size"]) if "core_size" in data.files else 0,
+            )
+
+
+# ---------------- Preprocessing ---------------- #
+
+def _witness_distances(adj, source, skip, targets, max_cost, settle_limit, hop_limit=WITNESS_HOP_LIMIT):
+    """
+    Bounded Dijkstra from `source` that never passes through `skip`.
+    It stops after `settle_limit` nodes, past `max_cost`, and never follows
+    a route of more than `hop_limit` roads, so every search stays local.
+    """
+    dist = {source: 0.0}
+    queue = [(0.0, 0, source)]
+    remaining = set(targets)
+    settled = 0
+    while queue and remaining and settled < settle_limit:
+        cost, hops, u = heapq.heappop(queue)
+        if cost > dist[u]:
+            continue
+        if cost > max_cost:
+            break
+        settled += 1
+        remaining.discard(u)
+        if hops == hop_limit:
+            continue
+        for v, (w, _) in adj[u].items():
+            if v == skip:
+                continue
+            nd = cost + w
+            if nd < dist.get(v, float("inf")):
+                dist[v] = nd
+                heapq.heappush(queue, (nd, hops + 1, v))
+    return dist
+
+
+def _shortcuts_for(adj, v, settle_limit, hop_limit=WITNESS_HOP_LIMIT):
+    """Shortcuts (u, x, cost) needed to contract v without changing any distance."""
+    neighbours = list(adj[v].items())
+    shortcuts = []
+    for i, (u, (w_uv, _)) in enumerate(neighbours):
+        others = neighbours[i + 1:]
+        if not others:
+            continue
+        max_cost = w_uv + max(w for _, (w, _) in others)
+        dist = _witness_distances(adj, u, v, [x for x, _ in others], max_cost, settle_limit, hop_limit)
+        for x, (w_vx, _) in others:
+            via = w_uv + w_vx
+            if dist.get(x, float("inf")) > via:
+                shortcuts.append((u, x, via))
+    return shortcuts
+
+
+def build_ch(csr, weight_type="distance", settle_limit=WITNESS_SETTLE_LIMIT, source_mtime=None,
+             hop_limit=WITNESS_HOP_LIMIT, core_degree=CORE_DEGREE):
+    """
+    Contract the nodes of `csr` for one metric.
+    Nodes are ordered by edge difference plus the number of already
+    contracted neighbours. Priorities are lazy: a node's is recomputed only
+    when it reaches the top of the queue, and it goes back in if it is no
+    longer the best. Witness searches are bounded by settled nodes and hops;
+    when a search gives up, a shortcut is added anyway, which costs space
+    but never correctness. Once the remaining graph averages more than
+    `core_degree` roads per node, contraction stops and the rest is kept as
+    a core (contracting it would only add shortcuts).
+    """
+    n = csr.num_nodes
+    column = csr.metric_column(weight_type)
+    adj = [dict() for _ in range(n)]
+    offsets = csr.offsets.tolist()
+    targets = csr.targets.tolist()
+    weights = column.tolist()
+    for u in range(n):
+        for k in range(offsets[u], offsets[u + 1]):
+            v, w = targets[k], weights[k]
+            if v != u and (v not in adj[u] or w < adj[u][v][0]):
+                adj[u][v] = (w, -1)
+
+    deleted_neighbours = [0] * n
+    arcs = sum(len(a) for a in adj)  # both directions of every remaining road
+
+    def priority(v, shortcuts):
+        return len(shortcuts) - len(adj[v]) + deleted_neighbours[v]
+
+    queue = [(priority(v, _shortcuts_for(adj, v, settle_limit, hop_limit)), v) for v in range(n)]
+    heapq.heapify(queue)
+    rank = np.full(n, -1, dtype=np.int32)
+    up = [None] * n
+    order = 0
+
+    while queue and arcs <= core_degree * (n - order):
+        _, v = heapq.heappop(queue)
+        # Lazy update: re-evaluate and push back if it is no longer the best.
+        shortcuts = _shortcuts_for(adj, v, settle_limit, hop_limit)
+        current = priority(v, shortcuts)
+        if queue and current > queue[0][0]:
+            heapq.heappush(queue, (current, v))
+            continue
+
+        rank[v] = order
+        order += 1
+        up[v] = [(x, w, mid) for x, (w, mid) in adj[v].items()]
+        arcs -= 2 * len(adj[v])
+        for x in adj[v]:
+            del adj[x][v]
+            deleted_neighbours[x] += 1
+        for u, x, via in shortcuts:
+            if x not in adj[u]:
+                arcs += 2
+            if x not in adj[u] or via < adj[u][x][0]:
+                adj[u][x] = (via, v)
+                adj[x][u] = (via, v)
+        adj[v] = {}
+
+    # The core: rank the remaining nodes last and keep every arc between them.
+    core = [v for _, v in sorted(queue)]
+    for v in core:
+        rank[v] = order
+        order += 1
+        up[v] = [(x, w, mid) for x, (w, mid) in adj[v].items()]
+
+    up_offsets = np.zeros(n + 1, dtype=np.int64)
+    up_offsets[1:] = np.cumsum([len(up[v]) for v in range(n)])
+    flat = [arc for v in range(n) for arc in up[v]]
+    up_targets = np.array([a[0] for a in flat], dtype=np.int32)
+    up_weights = np.array([a[1] for a in flat], dtype=np.float64)
+    up_mid = np.array([a[2] for a in flat], dtype=np.int32)
+    return ContractionHierarchy(weight_type, rank, up_offsets, up_targets, up_weights, up_mid, source_mtime,
+                                len(core))
+
+
+# ---------------- Query ---------------- #
+
+def _upward_arc(lists, a, b):
+    """Return (weight, mid) of the cheapest upward arc joining a and b."""
+    up_offsets, up_targets, up_weights, up_mid, rank = lists
+    lo, hi = (a, b) if rank[a] < rank[b] else (b, a)
+    best = None
+    for k in range(up_offsets[lo], up_offsets[lo + 1]):
+        if up_targets[k] == hi and (best is None or up_weights[k] < best[0]):
+            best = (up_weights[k], up_mid[k])
+    return best
+
+
+def _unpack(lists, path):
+    """Expand shortcut arcs in an id path back into original roads."""
+    result = [path[0]]
+    for k in range(len(path) - 1):
+        stack = [(path[k], path[k + 1])]
+        while stack:
+            a, b = stack.pop()
+            _, mid = _upward_arc(lists, a, b)
+            if mid == -1:
+                result.append(b)
+            else:
+                stack.append((mid, b))
+                stack.append((a, mid))
+    return result
+
+
+def ch_query(ch, csr, source, target, stats=None):
+    """
+    Bidirectional upward Dijkstra on a contraction hierarchy.
+    Returns (cost, id path) in the same format as dijkstra_csr; the cost is
+    re-summed along the unpacked path so it matches plain Dijkstra exactly.
+    """
+    if source == target:
+        if stats is not None:
+            stats["settled"] = 1
+        return 0.0, [source]
+
+    lists = ch._as_lists()
+    up_offsets, up_targets, up_weights = lists[0], lists[1], lists[2]
+    inf = float("inf")
+    dist = ({source: 0.0}, {target: 0.0})
+    pred = ({source: -1}, {target: -1})
+    queues = ([(0.0, source)], [(0.0, target)])
+    best, meet = inf, -1
+    settled = 0
+
+    while queues[0] or queues[1]:
+        side = 0 if queues[0] and (not queues[1] or queues[0][0][0] <= queues[1][0][0]) else 1
+        cost, u = heapq.heappop(queues[side])
+        if cost >= best:
+            queues[side].clear()  # nothing left in this direction can improve the answer
+            continue
+        if cost > dist[side][u]:
+            continue
+        settled += 1
+        other = dist[1 - side]
+        if u in other and cost + other[u] < best:
+            best, meet = cost + other[u], u
+
+        d_here = dist[side]
+        for k in range(up_offsets[u], up_offsets[u + 1]):
+            v = up_targets[k]
+            nd = cost + up_weights[k]
+            if nd < d_here.get(v, inf):
+                d_here[v] = nd
+                pred[side][v] = u
+                heapq.heappush(queues[side], (nd, v))
+
+    if stats is not None:
+        stats["settled"] = settled
+    if meet == -1:
+        return inf, []
+
+    path = []
+    node = meet
+    while node != -1:
+        path.append(node)
+        node = pred[0][node]
+    path.reverse()
+    node = pred[1][meet]
+    while node != -1:
+        path.append(node)
+        node = pred[1][node]
+
+    path = _unpack(lists, path)
+    return csr.path_cost(path, ch.weight_type), path
+
+
+# ---------------- Storage ---------------- #
+
+_loaded = {}
+
+
+def ch_file(weight_type, filename=DEFAULT_GRAPH_FILE):
+    """Where the hierarchy for a graph file and metric is stored."""
+    stem, _ = os.path.splitext(get_store(filename).filepath)
+    return f"{stem}.ch.{weight_type}.npz"
+
+
+def preprocess(filename=DEFAULT_GRAPH_FILE, metrics=METRICS, settle_limit=WITNESS_SETTLE_LIMIT):
+    """Offline step: build and save one hierarchy per metric. Returns {metric: path}."""
+    store = get_store(filename)
+    csr = store.csr()
+    written = {}
+    for weight_type in metrics:
+        ch = build_ch(csr, weight_type, settle_limit, source_mtime=store.mtime())
+        ch.revision = csr.revision
+        path = ch_file(weight_type, filename)
+        if not csr.revision:
+            ch.save(path)
+        _loaded[(store.filepath, weight_type)] = ch
+        written[weight_type] = path
+    return written
+
+
+def get_ch(weight_type="distance", filename=DEFAULT_GRAPH_FILE):
+    """
+    Return the hierarchy for the current graph version, or None if there
+    is none. Loads the preprocessed file when it matches the graph's mtime.
+    Nothing is built here: that is preprocess() (or
+    `python -m algorithms.contraction_hierarchy`). After in-memory edge
+    weight updates the file no longer describes the graph, so only a
+    hierarchy rebuilt with preprocess() since the update is returned.
+    """
+    store = get_store(filename)
+    mtime = store.mtime()
+    csr = store.csr()
+    key = (store.filepath, weight_type)
+    ch = _loaded.get(key)
+    if ch is not None and ch.source_mtime == mtime and ch.revision == csr.revision:
+        return ch
+    if csr.revision:
+        return None
+
+    path = ch_file(weight_type, filename)
+    ch = ContractionHierarchy.load(path) if os.path.exists(path) else None
+    if ch is None or ch.source_mtime != mtime:
+        return None
+    _loaded[key] = ch
+    return ch
+
+
+def ch_search(csr, source, target, weight_type="distance", stats=None):
+    """
+    dijkstra_csr-compatible entry point backed by the hierarchy of the graph
+    file `csr` came from. Without an up-to-date hierarchy (not preprocessed
+    yet, or weights updated since), or for a CSRGraph that did not come
+    from a graph file, the query runs bidirectional A* instead, counted
+    under ch.fallbacks when instrumentation is on.
+    """
+    store = store_for(csr)
+    ch = get_ch(weight_type, store.filename) if store is not None else None
+    if ch is None:
+        if instrumentation.ENABLED:
+            instrumentation.inc("ch.fallbacks")
+        return bidirectional_astar_csr(csr, source, target, weight_type, stats=stats)
+    return ch_query(ch, csr, source, target, stats=stats)
+
+
+def verify_against_dijkstra(csr, ch, samples=500, seed=0):
+    """
+    Randomised comparison with plain Dijkstra.
+    Returns a list of (source, target, dijkstra cost, ch cost) mismatches.
+    When several routes are equally short the two searches may pick different
+    ones, whose left-to-right float sums can differ in the last bit, so costs
+    are compared to within float rounding.
+    """
+    rng = random.Random(seed)
+    mismatches = []
+    for _ in range(samples):
+        s = rng.randrange(csr.num_nodes)
+        t = rng.randrange(csr.num_nodes)
+        expected, _ = dijkstra_csr(csr, s, t, ch.weight_type)
+        got, path = ch_query(ch, csr, s, t)
+        valid_path = not path or (path[0] == s and path[-1] == t)
+        same_cost = got == expected or math.isclose(got, expected, rel_tol=1e-12, abs_tol=1e-12)
+        if not same_cost or not valid_path:
+            mismatches.append((s, t, expected, got))
+    return mismatches
+
+
+if __name__ == "__main__":
+    written = preprocess()
+    csr = get_store().csr()
+    for metric, path in written.items():
+        ch = ContractionHierarchy.load(path)
+        bad = verify_against_dijkstra(csr, ch)
+        status = "✅ matches Dijkstra" if not bad else f"❌ {len(bad)} mismatches"
+        print(f"🗺️  {metric}: {ch.num_shortcuts} shortcuts, core of {ch.core_size} → {path} | {status}")
@@ -0,0 +1,132 @@
+from utils.graph_io import METRICS, csr_arrays, graph_to_arrays
+
+
+class CSRGraph:
+    """
+    Compact integer-indexed road graph.
+    Node names are interned to the `id` stored in the JSON, neighbours live in
+    CSR offset/target arrays and the three weight columns sit side by side in
+    one (num_arcs, 3) array. Every undirected road is stored as two arcs.
+    Optional speed profiles (see utils.graph_io) are kept as the shared
+    profile table plus one profile row id per arc.
+    """
+
+    def __init__(self, names, offsets, targets, weights, x=None, y=None, profiles=None, arc_profile=None):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.offsets = offsets    # int64, len = num_nodes + 1
+        self.targets = targets    # int32, len = num_arcs
+        self.weights = weights    # float64, shape (num_arcs, len(METRICS))
+        self.x = x                # lon per node id
+        self.y = y                # lat per node id
+        self.profiles = profiles        # float64 (num_profiles, slices) speed multipliers, or None
+        self.arc_profile = arc_profile  # int32 profile row per arc (-1 = constant speed), or None
+        self.revision = 0         # bumped by GraphStore.update_edge_weights
+
+    @classmethod
+    def from_graph(cls, graph):
+        """Build from the JSON graph dict (locations + edges)."""
+        return cls.from_graph_arrays(graph_to_arrays(graph))
+
+    @classmethod
+    def from_graph_arrays(cls, arrays):
+        """
+        Build from the column arrays of a binary graph file (see utils.graph_io).
+        A CSR stored in the file (already sorted, offsets checked on load)
+        is adopted as is, with no sort or copy.
+        """
+        if arrays.get("offsets") is not None:
+            return cls(arrays["names"], arrays["offsets"], arrays["targets"], arrays["arc_weights"],
+                       arrays["x"], arrays["y"], arrays.get("profiles"), arrays.get("arc_profile"))
+        return cls.from_arrays(arrays["names"], arrays["src"], arrays["dst"], arrays["weights"], arrays["x"], arrays["y"],
+                               arrays.get("profiles"), arrays.get("profile_ids"))
+
+    @classmethod
+    def from_arrays(cls, names, src, dst, weights, x=None, y=None, profiles=None, profile_ids=None):
+        """Build from undirected edge arrays (src, dst, weights[E, 3], optional profile_ids[E])."""
+        offsets, targets, arc_w, arc_profile = csr_arrays(len(names), src, dst, weights,
+                                                          profile_ids if profiles is not None else None)
+        return cls(names, offsets, targets, arc_w, x, y, profiles, arc_profile)
+
+    @property
+    def num_nodes(self):
+        return len(self.names)
+
+    @property
+    def num_arcs(self):
+        return len(self.targets)
+
+    def node_id(self, name):
+        return self.index[name]
+
+    def metric_column(self, weight_type="distance"):
+        """Return the weight column (a view) for one metric."""
+        return self.weights[:, METRICS.index(weight_type)]
+
+    def neighbours(self, node, weight_type="distance"):
+        """Return (target ids, weights) arrays for one node id."""
+        lo, hi = self.offsets[node], self.offsets[node + 1]
+        return self.targets[lo:hi], self.weights[lo:hi, METRICS.index(weight_type)]
+
+    def arc_weight(self, u, v, weight_type="distance"):
+        """Cheapest arc weight from u to v (inf if they are not adjacent)."""
+        targets, weights = self.neighbours(u, weight_type)
+        hits = weights[targets == v]
+        return float(hits.min()) if len(hits) else float("inf")
+
+    def path_cost(self, path, weight_type="distance"):
+        """Sum arc weights along an id path, left to right (same order as Dijkstra)."""
+        column = self.metric_column(weight_type)
+        total = 0.0
+        for k in range(len(path) - 1):
+            u, v = path[k], path[k + 1]
+            lo, hi = self.offsets[u], self.offsets[u + 1]
+            total += min(
+                (w for t, w in zip(self.targets[lo:hi].tolist(), column[lo:hi].tolist()) if t == v),
+                default=float("inf"),
+            )
+        return total
+
+    def adjacency_view(self, weight_type="distance"):
+        """Name-keyed read-only view compatible with build_adjacency_list output."""
+        return CSRAdjacency(self, weight_type)
+
+    def nbytes(self):
+        """Memory held by the CSR arrays."""
+        total = self.offsets.nbytes + self.targets.nbytes + self.weights.nbytes
+        if self.profiles is not None:
+            total += self.profiles.nbytes + self.arc_profile.nbytes
+        return total
+
+
+class CSRAdjacency:
+    """Maps location name → [(neighbour name, weight), ...] on top of a CSRGraph."""
+
+    def __init__(self, csr, weight_type="distance"):
+        self.csr = csr
+        self.weight_type = weight_type
+        self._column = csr.metric_column(weight_type)
+
+    def __getitem__(self, name):
+        csr = self.csr
+        u = csr.index[name]
+        lo, hi = csr.offsets[u], csr.offsets[u + 1]
+        names = csr.names
+        return [(names[v], w) for v, w in zip(csr.targets[lo:hi].tolist(), self._column[lo:hi].tolist())]
+
+    def get(self, name, default=None):
+        if name not in self.csr.index:
+            return default
+        return self[name]
+
+    def __contains__(self, name):
+        return name in self.csr.index
+
+    def __iter__(self):
+        return iter(self.csr.names)
+
+    def __len__(self):
+        return self.csr.num_nodes
+
+    def keys(self):
+        return list(self.csr.names)
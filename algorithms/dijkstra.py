@@ -1,62 +1,240 @@
-import json
-import os
 import heapq
-
-
-def load_city_graph(filename="data/bhubaneswar_graph.json"):
-    """Load the city graph safely no matter where the script is run from"""
-    # Get absolute path to the project root
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # goes up from algorithms/
-    filepath = os.path.join(base_dir, filename)
-
-    if not os.path.exists(filepath):
-        raise FileNotFoundError(
-            f"⚠️ Could not find {filepath}\n"
-            f"Make sure bhubaneswar_graph.json is inside the project's data/ folder.\n"
-            f"Expected full path: {filepath}"
-        )
-
-    with open(filepath, "r") as f:
-        data = json.load(f)
-    return data
-
-
-def build_adjacency_list(graph, weight_type="distance"):
-    adjacency = {}
-    for edge in graph["edges"]:
-        src = edge["from"]
-        dst = edge["to"]
-        weight = edge[weight_type]
-        adjacency.setdefault(src, []).append((dst, weight))
-        adjacency.setdefault(dst, []).append((src, weight))
-    return adjacency
-
-
-def dijkstra(adjacency, start, end):
-    queue = [(0, start, [])]
-    visited = set()
+from .csr_graph import CSRGraph
+from .graph_store import DEFAULT_GRAPH_FILE, load_city_graph, build_adjacency_list, get_store
+from .route_cache import route_cache
+from utils import instrumentation
+
+
+def dijkstra(adjacency, start, end, weight_type="distance"):
+    """
+    Shortest path between two location names.
+    `adjacency` is either a name-keyed adjacency list or a CSRGraph
+    (in which case `weight_type` selects the weight column).
+    """
+    if isinstance(adjacency, CSRGraph):
+        if start not in adjacency.index or end not in adjacency.index:
+            return float("inf"), []
+        cost, id_path = dijkstra_csr(adjacency, adjacency.index[start], adjacency.index[end], weight_type)
+        return cost, [adjacency.names[i] for i in id_path]
+
+    inf = float("inf")
+    dist = {start: 0}
+    pred = {start: None}
+    queue = [(0, start)]
 
     while queue:
-        (cost, node, path) = heapq.heappop(queue)
-        if node in visited:
-            continue
-        path = path + [node]
-        visited.add(node)
+        cost, node = heapq.heappop(queue)
+        if cost > dist[node]:
+            continue  # stale entry left behind by a later decrease-key
 
         if node == end:
-            return cost, path
+            return cost, rebuild_path(pred, end, None)
 
         for neighbor, weight in adjacency.get(node, []):
-            if neighbor not in visited:
-                heapq.heappush(queue, (cost + weight, neighbor, path))
-
-    return float("inf"), []
-
-
-def find_optimal_route(start, end, weight_type="distance"):
-    graph = load_city_graph()
-    adjacency = build_adjacency_list(graph, weight_type=weight_type)
-    total_cost, path = dijkstra(adjacency, start, end)
+            new_cost = cost + weight
+            if new_cost < dist.get(neighbor, inf):
+                dist[neighbor] = new_cost
+                pred[neighbor] = node
+                heapq.heappush(queue, (new_cost, neighbor))
+
+    return inf, []
+
+
+def rebuild_path(pred, end, root_marker):
+    """Walk predecessors back from `end` until `root_marker` and return the path."""
+    path = []
+    node = end
+    while node != root_marker:
+        path.append(node)
+        node = pred[node]
+    path.reverse()
+    return path
+
+
+def dijkstra_csr(csr, source, target, weight_type="distance", stats=None):
+    """
+    Shortest path between two node ids on a CSRGraph. Returns (cost, id path).
+    If `stats` is a dict, the number of settled nodes is stored under "settled".
+    With instrumentation enabled, settled nodes and heap pushes are recorded
+    per query under dijkstra.settled / dijkstra.heap_pushes.
+    """
+    return dijkstra_column(csr, csr.metric_column(weight_type), source, target, stats)
+
+
+def dijkstra_column(csr, column, source, target, stats=None):
+    """dijkstra_csr over an arbitrary per-arc cost array (e.g. a weighted mix of metrics)."""
+    offsets = csr.offsets
+    targets = csr.targets
+    inf = float("inf")
+    dist = [inf] * csr.num_nodes
+    pred = [-1] * csr.num_nodes
+
+    settled = stale = 0
+
+    dist[source] = 0.0
+    queue = [(0.0, source)]
+    while queue:
+        cost, u = heapq.heappop(queue)
+        if cost > dist[u]:
+            stale += 1
+            continue
+        settled += 1
+        if u == target:
+            if stats is not None:
+                stats["settled"] = settled
+            if instrumentation.ENABLED:
+                _record_search("dijkstra", settled, settled + stale + len(queue))
+                with instrumentation.stage("rebuild_path"):
+                    return cost, rebuild_path(pred, target, -1)
+            return cost, rebuild_path(pred, target, -1)
+
+        lo, hi = offsets[u], offsets[u + 1]
+        for v, w in zip(targets[lo:hi].tolist(), column[lo:hi].tolist()):
+            nd = cost + w
+            if nd < dist[v]:
+                dist[v] = nd
+                pred[v] = u
+                heapq.heappush(queue, (nd, v))
+
+    if stats is not None:
+        stats["settled"] = settled
+    if instrumentation.ENABLED:
+        _record_search("dijkstra", settled, settled + stale)
+    return inf, []
+
+
+def _record_search(name, settled, pushes):
+    """Per-query counts; every heap push is popped as settled or stale, or is still queued."""
+    instrumentation.inc(f"{name}.queries")
+    instrumentation.observe(f"{name}.settled", settled)
+    instrumentation.observe(f"{name}.heap_pushes", pushes)
+
+
+def shortest_path_tree_csr(csr, source, weight_type="distance", stop_at=None):
+    """
+    One-to-many Dijkstra on a CSRGraph.
+    Returns (dist, pred) lists indexed by node id. If `stop_at` is a set of
+    node ids the search ends once all of them are settled.
+    """
+    offsets = csr.offsets
+    targets = csr.targets
+    column = csr.metric_column(weight_type)
+    inf = float("inf")
+    dist = [inf] * csr.num_nodes
+    pred = [-1] * csr.num_nodes
+    remaining = set(stop_at) if stop_at is not None else None
+
+    settled = stale = 0
+
+    dist[source] = 0.0
+    queue = [(0.0, source)]
+    while queue:
+        cost, u = heapq.heappop(queue)
+        if cost > dist[u]:
+            stale += 1
+            continue
+        settled += 1
+        if remaining is not None:
+            remaining.discard(u)
+            if not remaining:
+                break
+
+        lo, hi = offsets[u], offsets[u + 1]
+        for v, w in zip(targets[lo:hi].tolist(), column[lo:hi].tolist()):
+            nd = cost + w
+            if nd < dist[v]:
+                dist[v] = nd
+                pred[v] = u
+                heapq.heappush(queue, (nd, v))
+
+    if instrumentation.ENABLED:
+        _record_search("spt", settled, settled + stale + len(queue))
+    return dist, pred
+
+
+ROUTING_METHODS = ("dijkstra", "astar", "bidirectional", "ch")
+
+
+def _engine(method):
+    """Return the id-based search function for a routing method."""
+    if method == "dijkstra":
+        return dijkstra_csr
+    # imported here because astar builds on this module
+    from .astar import astar_csr, bidirectional_astar_csr
+    if method == "astar":
+        return astar_csr
+    if method == "bidirectional":
+        return bidirectional_astar_csr
+    if method == "ch":
+        from .contraction_hierarchy import ch_search
+        return ch_search
+    raise ValueError(f"Unknown routing method '{method}', expected one of {ROUTING_METHODS}")
+
+
+TIME_DEPENDENT_METHODS = ("dijkstra", "astar")
+
+
+def _time_dependent_engine(method, weight_type, depart):
+    """
+    Search function for a departure-time query (only travel time depends
+    on the hour), plus the departure in minutes after midnight.
+    """
+    if weight_type != "time":
+        raise ValueError(f"A departure time only applies to weight_type='time', not '{weight_type}'")
+    if method not in TIME_DEPENDENT_METHODS:
+        raise ValueError(f"Method '{method}' has no time-dependent version, expected one of {TIME_DEPENDENT_METHODS}")
+    # imported here because time_dependent builds on this module
+    from .time_dependent import parse_clock, td_route_csr
+    depart = parse_clock(depart)
+
+    def search(csr, source, target, weight_type, stats=None):
+        return td_route_csr(csr, source, target, depart, heuristic=method == "astar", stats=stats)
+
+    return search, depart
+
+
+def find_optimal_route(start, end, weight_type="distance", method="dijkstra", stats=None,
+                       filename=DEFAULT_GRAPH_FILE, cache=True, depart=None):
+    """
+    Optimal route between two location names on the shared graph.
+    `method` picks the search: plain "dijkstra", "astar" (great-circle
+    heuristic), "bidirectional" A* or "ch" (contraction hierarchy, built by
+    `python -m algorithms.contraction_hierarchy`; bidirectional A* until then).
+    Pass a dict as `stats` to get the number of settled nodes back; on a
+    cache hit it is the count from the search that filled the cache, and
+    stats["cached"] is True.
+    With `depart` (minutes after midnight or "HH:MM") and weight_type="time"
+    the roads' hourly speed profiles are used and the cost is the travel
+    time when leaving then (dijkstra / astar only).
+    Results are kept in the LRU `route_cache`, keyed by graph version, so a
+    changed graph file or edge weight is never answered from the cache.
+    """
+    store = get_store(filename)
+    csr = store.csr()  # loading / CSR building is timed inside the store
+    if depart is not None:
+        search, depart = _time_dependent_engine(method, weight_type, depart)
+    else:
+        search = _engine(method)
+    if start not in csr.index or end not in csr.index:
+        return float("inf"), []
+
+    key = (store.filepath, store.version, weight_type, method, start, end, depart)
+    if cache:
+        hit = route_cache.get(key)
+        if hit is not None:
+            if stats is not None:
+                stats["settled"] = hit[2]
+                stats["cached"] = True
+            return hit[0], list(hit[1])
+
+    search_stats = stats if stats is not None else {}
+    with instrumentation.stage("search"):
+        total_cost, id_path = search(csr, csr.index[start], csr.index[end], weight_type, stats=search_stats)
+    path = [csr.names[i] for i in id_path]
+    if cache:
+        route_cache.put(key, (total_cost, tuple(path), search_stats.get("settled")))
+    if stats is not None:
+        stats["cached"] = False
     return total_cost, path
 
 
@@ -0,0 +1,264 @@
+import hashlib
+import os
+import threading
+import numpy as np
+from .dijkstra import dijkstra_csr, rebuild_path, shortest_path_tree_csr
+from .dynamic_sssp import repair_tree
+from .graph_store import DEFAULT_GRAPH_FILE, get_store
+from utils import instrumentation
+
+MAX_CACHED_MATRICES = 32
+MAX_CACHED_TREES = 64
+
+
+class ShortestPathTree:
+    """Distances and predecessors from one source to every location."""
+
+    def __init__(self, csr, source, dist, pred, weight_type="distance"):
+        self.csr = csr
+        self.source = source
+        self.dist = dist
+        self.pred = pred
+        self.weight_type = weight_type
+
+    def cost(self, target):
+        return self.dist[self.csr.index[target]]
+
+    def path(self, target):
+        t = self.csr.index[target]
+        if self.dist[t] == float("inf"):
+            return []
+        return [self.csr.names[i] for i in rebuild_path(self.pred, t, -1)]
+
+    def repair(self, changes):
+        """Bring the tree up to date after arc weight changes (see dynamic_sssp.repair_tree)."""
+        repair_tree(self.csr, self.dist, self.pred, changes, self.weight_type)
+
+
+class DistanceMatrix:
+    """
+    Pairwise shortest-path costs between a fixed list of locations.
+    `matrix[i][j]` is the cost from nodes[i] to nodes[j]. Compact matrices
+    (the default) keep, per row, only the part of its shortest-path tree
+    that leads to the later nodes (`stop_trees`, sorted node ids and their
+    predecessors), so paths are walked back without searching again.
+    Repairable matrices keep each row's full tree (`dists` / `preds`) so the
+    rows can be repaired after edge weight updates instead of recomputed.
+    Matrices loaded from disk have neither and solve each path once.
+    """
+
+    def __init__(self, csr, nodes, weight_type, matrix, preds=None, dists=None, stop_trees=None):
+        self.csr = csr
+        self.nodes = list(nodes)
+        self.position = {name: i for i, name in enumerate(self.nodes)}
+        self.weight_type = weight_type
+        self.matrix = matrix
+        self.preds = preds
+        self.dists = dists
+        self.stop_trees = stop_trees
+        self._rows = None
+        self._paths = {}
+
+    def rows(self):
+        """Matrix as nested Python lists (fastest for scalar lookups in loops)."""
+        if self._rows is None:
+            self._rows = np.asarray(self.matrix).tolist()
+        return self._rows
+
+    def cost(self, a, b):
+        return float(self.matrix[self.position[a], self.position[b]])
+
+    def path(self, a, b):
+        i, j = self.position[a], self.position[b]
+        if self.matrix[i, j] == float("inf"):
+            return []
+        if self.preds is not None:
+            return [self.csr.names[k] for k in rebuild_path(self.preds[i], self.csr.index[b], -1)]
+        if self.stop_trees is not None:
+            if i > j:  # row i only holds the tree towards later nodes; roads are undirected
+                return self.path(b, a)[::-1]
+            return [self.csr.names[k] for k in _walk_stop_tree(self.stop_trees[i], self.csr.index[b])]
+        if (a, b) not in self._paths:
+            self._paths[(a, b)] = _dijkstra_names(self.csr, a, b, self.weight_type)[1]
+        return list(self._paths[(a, b)])
+
+    def repair(self, changes):
+        """Repair every row's tree after arc weight changes and refresh the matrix."""
+        ids = np.array([self.csr.index[n] for n in self.nodes])
+        for i in range(len(self.nodes)):
+            repair_tree(self.csr, self.dists[i], self.preds[i], changes, self.weight_type)
+            self.matrix[i] = self.dists[i][ids]
+        self._rows = None
+
+    def route_cost(self, route):
+        """Total cost of visiting `route` in order."""
+        rows = self.rows()
+        idx = [self.position[n] for n in route]
+        return sum(rows[idx[k]][idx[k + 1]] for k in range(len(idx) - 1))
+
+    def expand_route(self, route):
+        """Full location-by-location path for a visiting order."""
+        full = [route[0]] if route else []
+        for k in range(len(route) - 1):
+            full.extend(self.path(route[k], route[k + 1])[1:])
+        return full
+
+
+def _stop_tree(pred, targets):
+    """The predecessors on the tree paths to `targets` only, as sorted (node ids, preds) arrays."""
+    keep = {}
+    for node in targets:
+        while node not in keep and pred[node] != -1:
+            keep[node] = pred[node]
+            node = pred[node]
+    nodes = np.array(sorted(keep), dtype=np.int32)
+    return nodes, np.array([keep[k] for k in nodes.tolist()], dtype=np.int32)
+
+
+def _walk_stop_tree(tree, target):
+    nodes, preds = tree
+    path = [target]
+    k = np.searchsorted(nodes, target)
+    while k < len(nodes) and nodes[k] == path[-1]:
+        path.append(int(preds[k]))
+        k = np.searchsorted(nodes, path[-1])
+    path.reverse()
+    return path
+
+
+def _dijkstra_names(csr, start, end, weight_type):
+    cost, id_path = dijkstra_csr(csr, csr.index[start], csr.index[end], weight_type)
+    return cost, [csr.names[i] for i in id_path]
+
+
+_tree_cache = {}
+_matrix_cache = {}
+_matrix_lock = threading.Lock()
+
+
+def _on_weights_changed(store, applied):
+    """
+    GraphStore update listener: repair cached trees and repairable matrices
+    of the store's graph in place and move them to the new graph version.
+    Compact matrices have no trees to repair and are dropped.
+    """
+    with _matrix_lock:
+        for cache in (_tree_cache, _matrix_cache):
+            for key in [k for k in cache if k[0] == store.filepath]:
+                entry = cache.pop(key)
+                weight_type = key[2]
+                if weight_type in applied:
+                    if isinstance(entry, DistanceMatrix) and entry.dists is None:
+                        continue
+                    entry.repair(applied[weight_type])
+                cache[(key[0], store.version) + key[2:]] = entry
+
+
+def _remember(cache, key, value, limit):
+    with _matrix_lock:
+        if len(cache) >= limit:
+            cache.pop(next(iter(cache)))
+        cache[key] = value
+
+
+def shortest_path_tree(source, weight_type="distance", filename=DEFAULT_GRAPH_FILE):
+    """
+    Full one-to-all shortest path tree from `source`.
+    Trees are cached per graph version and repaired in place when edge
+    weights are updated; treat them as read-only.
+    """
+    store = get_store(filename)
+    csr = store.csr()
+    store.add_update_listener(_on_weights_changed)
+    key = (store.filepath, store.version, weight_type, source)
+    with _matrix_lock:
+        cached = _tree_cache.get(key)
+    if cached is not None:
+        return cached
+
+    dist, pred = shortest_path_tree_csr(csr, csr.index[source], weight_type)
+    tree = ShortestPathTree(csr, source, dist, pred, weight_type)
+    _remember(_tree_cache, key, tree, MAX_CACHED_TREES)
+    return tree
+
+
+def _matrix_file(store, nodes, weight_type):
+    """Path of the on-disk .npy for this graph file version, metric and node list."""
+    key = "\n".join([str(store.mtime()), weight_type] + list(nodes))
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    stem, _ = os.path.splitext(store.filepath)
+    return f"{stem}.{weight_type}.{digest}.npy"
+
+
+def _compact_matrix(csr, ids, weight_type):
+    """
+    Costs plus the paths to the stops, not whole trees. Roads are
+    undirected, so the matrix is symmetric: row i searches until nodes
+    i+1.. are settled, fills both halves and keeps the tree paths to those
+    nodes; the last row needs no search at all.
+    """
+    matrix = np.zeros((len(ids), len(ids)), dtype=np.float64)
+    stop_trees = []
+    for i, source in enumerate(ids[:-1]):
+        later = ids[i + 1:]
+        dist, pred = shortest_path_tree_csr(csr, source, weight_type, stop_at=set(later))
+        row = [dist[t] for t in later]
+        matrix[i, i + 1:] = row
+        matrix[i + 1:, i] = row
+        stop_trees.append(_stop_tree(pred, later))
+    stop_trees.append(_stop_tree([], []))
+    return DistanceMatrix(csr, [csr.names[t] for t in ids], weight_type, matrix, stop_trees=stop_trees)
+
+
+def _repairable_matrix(csr, ids, weight_type):
+    """Full one-to-all tree per row (O(len(ids) x |V|) memory), kept for repair()."""
+    matrix = np.empty((len(ids), len(ids)), dtype=np.float64)
+    preds, dists = [], []
+    for i, source in enumerate(ids):
+        dist, pred = shortest_path_tree_csr(csr, source, weight_type)
+        matrix[i] = [dist[t] for t in ids]
+        dists.append(np.asarray(dist, dtype=np.float64))
+        preds.append(np.asarray(pred, dtype=np.int32))
+    return DistanceMatrix(csr, [csr.names[t] for t in ids], weight_type, matrix, preds, dists)
+
+
+def distance_matrix(nodes=None, weight_type="distance", filename=DEFAULT_GRAPH_FILE, persist=False,
+                    repairable=False):
+    """
+    Compute (or reuse) the shortest-path matrix between `nodes`.
+    By default each row's Dijkstra stops once the remaining nodes are
+    settled and only the costs are kept. With `repairable=True` every row
+    keeps its full shortest-path tree, so cached matrices are repaired in
+    place after edge weight updates instead of being dropped and recomputed;
+    that costs one |V|-sized tree per row, so ask for it only when weights
+    change often. Results are cached in-process per graph version; with
+    `persist=True` a compact matrix is also stored as a .npy next to the
+    graph file and memory-mapped on later loads (not while in-memory weight
+    edits are active). `nodes=None` means every location (all-pairs).
+    """
+    store = get_store(filename)
+    csr = store.csr()
+    store.add_update_listener(_on_weights_changed)
+    nodes = list(csr.names) if nodes is None else list(dict.fromkeys(nodes))
+    key = (store.filepath, store.version, weight_type, tuple(nodes))
+
+    with _matrix_lock:
+        cached = _matrix_cache.get(key)
+    if cached is not None and (cached.dists is not None or not repairable):
+        if instrumentation.ENABLED:
+            instrumentation.inc("matrix.cache_hits")
+        return cached
+
+    npy_path = _matrix_file(store, nodes, weight_type) if persist and not repairable and not csr.revision else None
+    if npy_path and os.path.exists(npy_path):
+        result = DistanceMatrix(csr, nodes, weight_type, np.load(npy_path, mmap_mode="r"))
+    else:
+        ids = [csr.index[n] for n in nodes]
+        result = (_repairable_matrix if repairable else _compact_matrix)(csr, ids, weight_type)
+        if instrumentation.ENABLED:
+            instrumentation.inc("matrix.trees_solved", len(ids) if repairable else max(len(ids) - 1, 0))
+        if npy_path:
+            np.save(npy_path, result.matrix)
+
+    _remember(_matrix_cache, key, result, MAX_CACHED_MATRICES)
+    return result
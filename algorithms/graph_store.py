@@ -0,0 +1,247 @@
+import json
+import os
+import threading
+import numpy as np
+from .csr_graph import CSRGraph, METRICS
+from utils import instrumentation
+from utils.graph_io import arrays_to_graph, is_binary_graph, load_graph_arrays
+
+DEFAULT_GRAPH_FILE = "data/bhubaneswar_graph.json"
+
+
+def resolve_graph_path(filename=DEFAULT_GRAPH_FILE):
+    """Resolve a graph filename against the project root (absolute paths pass through)."""
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # goes up from algorithms/
+    return os.path.join(base_dir, filename)
+
+
+def _check_exists(filepath):
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(
+            f"⚠️ Could not find {filepath}\n"
+            f"Make sure bhubaneswar_graph.json is inside the project's data/ folder.\n"
+            f"Expected full path: {filepath}"
+        )
+
+
+def load_city_graph(filename=DEFAULT_GRAPH_FILE):
+    """Load the city graph safely no matter where the script is run from (.json or binary .npz)"""
+    filepath = resolve_graph_path(filename)
+    _check_exists(filepath)
+    if is_binary_graph(filepath):
+        return arrays_to_graph(load_graph_arrays(filepath))
+    with open(filepath, "r") as f:
+        data = json.load(f)
+    return data
+
+
+def build_adjacency_list(graph, weight_type="distance"):
+    adjacency = {}
+    for edge in graph["edges"]:
+        src = edge["from"]
+        dst = edge["to"]
+        weight = edge[weight_type]
+        adjacency.setdefault(src, []).append((dst, weight))
+        adjacency.setdefault(dst, []).append((src, weight))
+    return adjacency
+
+
+class GraphStore:
+    """
+    Process-wide cache for one graph file.
+    The file is parsed once, adjacency lists are built once per metric,
+    and everything is rebuilt only when the file's mtime changes.
+    Binary (.npz) graphs go straight from their arrays into the CSRGraph;
+    the name-keyed dict is only built if someone asks for graph().
+    Returned objects are shared between callers and must not be mutated;
+    use update_edge_weights to change road weights in the loaded graph.
+    """
+
+    def __init__(self, filename=DEFAULT_GRAPH_FILE):
+        self.filename = filename
+        self.filepath = resolve_graph_path(filename)
+        self.version = 0
+        self._mtime = None
+        self._graph = None
+        self._arrays = None
+        self._adjacency = {}
+        self._csr = None
+        self._pending_edits = []  # weight edits not yet copied into the graph dict
+        self._listeners = []
+        self._lock = threading.RLock()
+
+    def _refresh(self):
+        """Reload the graph if the file changed since the last load."""
+        try:
+            mtime = os.stat(self.filepath).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+
+        if (self._graph is not None or self._arrays is not None) and mtime == self._mtime:
+            return
+
+        with instrumentation.stage("load_graph"):
+            if is_binary_graph(self.filepath):
+                _check_exists(self.filepath)
+                self._arrays = load_graph_arrays(self.filepath)
+                self._graph = None
+            else:
+                self._graph = load_city_graph(self.filename)
+                self._arrays = None
+        self._adjacency = {}
+        self._csr = None
+        self._pending_edits = []
+        self._mtime = mtime
+        self.version += 1
+
+    def graph(self):
+        """Return the parsed graph dict."""
+        with self._lock:
+            self._refresh()
+            if self._graph is None:
+                self._graph = arrays_to_graph(self._arrays)
+            if self._pending_edits:
+                self._apply_edits_to_dict()
+            return self._graph
+
+    def mtime(self):
+        """Return the file mtime (ns) of the currently loaded graph."""
+        with self._lock:
+            self._refresh()
+            return self._mtime
+
+    def adjacency(self, weight_type="distance"):
+        """Return the prebuilt adjacency list for one metric."""
+        with self._lock:
+            self._refresh()
+            if weight_type not in self._adjacency:
+                graph = self.graph()
+                with instrumentation.stage("build_adjacency"):
+                    self._adjacency[weight_type] = build_adjacency_list(graph, weight_type=weight_type)
+            return self._adjacency[weight_type]
+
+    def csr(self):
+        """Return the compact CSRGraph holding all metrics."""
+        with self._lock:
+            self._refresh()
+            if self._csr is None:
+                with instrumentation.stage("build_csr"):
+                    if self._arrays is not None:
+                        self._csr = CSRGraph.from_graph_arrays(self._arrays)
+                    else:
+                        self._csr = CSRGraph.from_graph(self._graph)
+            return self._csr
+
+    def add_update_listener(self, listener):
+        """Call listener(store, changes) after every update_edge_weights (registered once)."""
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def update_edge_weights(self, changes):
+        """
+        Change road weights in the loaded graph (the file on disk is untouched,
+        and a later change to the file replaces these edits).
+        `changes` is an iterable of (from, to, metric, new_value); both
+        directions of the road are updated in place in the CSRGraph. The
+        store version is bumped, so cached routes and tours stop matching,
+        and every update listener gets the arc-level changes so it can repair
+        what it holds. Returns {metric: [(u, v, old, new), ...]} by node id.
+        """
+        with self._lock:
+            csr = self.csr()
+            applied = {}
+            edits = []
+            for a, b, metric, value in changes:
+                if metric not in METRICS:
+                    raise ValueError(f"Unknown metric '{metric}', expected one of {METRICS}")
+                value = float(value)
+                if not value >= 0:
+                    raise ValueError(f"Road weights must be non-negative, got {value}")
+                u, v = csr.index[a], csr.index[b]
+                col = METRICS.index(metric)
+                found = False
+                for x, y in ((u, v), (v, u)):
+                    lo, hi = csr.offsets[x], csr.offsets[x + 1]
+                    for arc in (np.flatnonzero(csr.targets[lo:hi] == y) + lo).tolist():
+                        found = True
+                        old = float(csr.weights[arc, col])
+                        if old != value:
+                            csr.weights[arc, col] = value
+                            applied.setdefault(metric, []).append((x, y, old, value))
+                if not found:
+                    raise KeyError(f"No road between '{a}' and '{b}'")
+                edits.append((a, b, metric, value))
+
+            if not applied:
+                return applied
+            self._pending_edits.extend(edits)
+            for metric in applied:
+                self._adjacency.pop(metric, None)
+            csr.revision += 1
+            self.version += 1
+            for listener in list(self._listeners):
+                listener(self, applied)
+            return applied
+
+    def _apply_edits_to_dict(self):
+        latest = {}
+        for a, b, metric, value in self._pending_edits:
+            latest.setdefault(frozenset((a, b)), {})[metric] = value
+        for edge in self._graph["edges"]:
+            update = latest.get(frozenset((edge["from"], edge["to"])))
+            if update:
+                edge.update(update)
+        self._pending_edits = []
+
+    def clear(self):
+        """Drop everything so the next access reloads from disk."""
+        with self._lock:
+            self._graph = None
+            self._arrays = None
+            self._adjacency = {}
+            self._csr = None
+            self._pending_edits = []
+            self._mtime = None
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(filename=DEFAULT_GRAPH_FILE):
+    """Return the shared GraphStore for a graph file."""
+    filepath = resolve_graph_path(filename)
+    with _stores_lock:
+        store = _stores.get(filepath)
+        if store is None:
+            store = GraphStore(filename)
+            _stores[filepath] = store
+        return store
+
+
+def store_for(csr):
+    """Return the GraphStore that built `csr` (None if it did not come from one)."""
+    with _stores_lock:
+        stores = list(_stores.values())
+    return next((store for store in stores if store._csr is csr), None)
+
+
+def get_graph(filename=DEFAULT_GRAPH_FILE):
+    """Return the cached graph dict for a file."""
+    return get_store(filename).graph()
+
+
+def get_adjacency(weight_type="distance", filename=DEFAULT_GRAPH_FILE):
+    """Return the cached adjacency list for a file and metric."""
+    return get_store(filename).adjacency(weight_type)
+
+
+def get_csr(filename=DEFAULT_GRAPH_FILE):
+    """Return the cached CSRGraph for a file."""
+    return get_store(filename).csr()
+
+
+def update_edge_weights(changes, filename=DEFAULT_GRAPH_FILE):
+    """Apply (from, to, metric, new_value) weight changes to the loaded graph."""
+    return get_store(filename).update_edge_weights(changes)
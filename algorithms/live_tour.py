@@ -0,0 +1,238 @@
+import argparse
+import json
+import math
+import sys
+import time
+from .dijkstra import shortest_path_tree_csr
+from .graph_store import DEFAULT_GRAPH_FILE, get_store
+from .tsp_solver import SOLVERS, or_opt, pick_solver, tour_cost, two_opt
+from utils import instrumentation
+
+EVENT_TYPES = ("add", "remove", "position")
+DEFAULT_REPAIR_BUDGET = 0.01  # seconds of local search per event
+
+
+class LiveTour:
+    """
+    A multi-stop route kept up to date while the vehicle is out.
+    route[0] is the vehicle's current position and route[-1] the end
+    (the start depot for a closed tour); both stay fixed. Events change the
+    pending stops in between:
+      add       cheapest insertion of the new stop,
+      remove    drop a completed or cancelled stop,
+      position  the vehicle reached a new location (a pending stop there
+                counts as visited),
+    each followed by 2-opt / Or-opt repair for at most `repair_budget`
+    seconds. Pair costs are cached: a new location costs one one-to-all
+    Dijkstra (roads are undirected, so its row is also its column) and
+    nothing is re-solved from scratch unless the graph itself changes.
+    """
+
+    def __init__(self, start, stops=(), end=None, weight_type="distance", filename=DEFAULT_GRAPH_FILE,
+                 repair_budget=DEFAULT_REPAIR_BUDGET, time_budget=1.0):
+        self.weight_type = weight_type
+        self.filename = filename
+        self.repair_budget = repair_budget
+        self.store = get_store(filename)
+        self.version = None
+        self.names = []  # slot -> location name
+        self.slot = {}   # location name -> slot in rows
+        self.rows = []   # rows[a][b]: pair cost between slots
+        self.unreachable = []
+        self.events = 0
+        self.latency = instrumentation.Histogram(instrumentation.MS_BUCKETS)
+
+        stops = [s for s in dict.fromkeys(stops) if s != start and s != (end or start)]
+        self._refresh()
+        self._ensure([start, end or start] + stops)
+        first, last = self.slot[start], self.slot[end or start]
+        reachable = [self.slot[s] for s in stops if self._reachable(s, first)]
+        method = pick_solver(len(reachable))
+        _, self.order = SOLVERS[method](self.rows, first, last, reachable, time_budget=time_budget)
+
+    # -- pair costs -- #
+
+    def _refresh(self):
+        """Re-cost every cached pair if the graph file or its weights changed."""
+        self.store.csr()  # refresh so the version below is current
+        if self.store.version == self.version:
+            return
+        self.version = self.store.version
+        names, self.names, self.slot, self.rows = self.names, [], {}, []
+        self._ensure(names)
+
+    def _ensure(self, names):
+        """Give every name a slot, with one shortest-path tree per new location."""
+        csr = self.store.csr()
+        new = [n for n in dict.fromkeys(names) if n not in self.slot]
+        unknown = [n for n in new if n not in csr.index]
+        if unknown:
+            raise KeyError(f"Unknown locations {unknown}")
+        if not new:
+            return
+        for name in new:
+            self.slot[name] = len(self.names)
+            self.names.append(name)
+            for row in self.rows:
+                row.append(math.inf)
+            self.rows.append([math.inf] * len(self.names))
+        ids = [csr.index[n] for n in self.names]
+        for name in new:
+            a = self.slot[name]
+            dist, _ = shortest_path_tree_csr(csr, csr.index[name], self.weight_type, stop_at=set(ids))
+            for b, node in enumerate(ids):
+                self.rows[a][b] = self.rows[b][a] = dist[node]
+
+    def _reachable(self, name, origin):
+        """False (and remembered in `unreachable`) if no road leads from slot `origin` to `name`."""
+        if math.isinf(self.rows[origin][self.slot[name]]):
+            self.unreachable.append(name)
+            return False
+        return True
+
+    def _compact(self):
+        """Drop slots no longer on the route once they outnumber the live ones."""
+        if len(self.names) <= 2 * len(self.order):
+            return
+        keep = list(dict.fromkeys(self.order))
+        remap = {old: new for new, old in enumerate(keep)}
+        self.rows = [[self.rows[a][b] for b in keep] for a in keep]
+        self.names = [self.names[a] for a in keep]
+        self.slot = {name: i for i, name in enumerate(self.names)}
+        self.order = [remap[a] for a in self.order]
+
+    # -- events -- #
+
+    def add(self, name):
+        """Insert a new stop where it adds the least cost (no-op if the route already passes there)."""
+        if name in self.route or name in self.unreachable:
+            return
+        self._ensure([name])
+        if not self._reachable(name, self.order[0]):
+            return
+        x = self.slot[name]
+        rows, order = self.rows, self.order
+        best_pos, best_delta = 1, math.inf
+        for p in range(len(order) - 1):
+            a, b = order[p], order[p + 1]
+            delta = rows[a][x] + rows[x][b] - rows[a][b]
+            if delta < best_delta:
+                best_pos, best_delta = p + 1, delta
+        order.insert(best_pos, x)
+
+    def remove(self, name):
+        """Drop a pending stop (delivered or cancelled); no-op if it is not pending."""
+        if name in self.unreachable:
+            self.unreachable.remove(name)
+        elif name in self.stops:
+            self.order.remove(self.slot[name])
+
+    def move_vehicle(self, name):
+        """The vehicle is now at `name`; a pending stop there is treated as delivered."""
+        if name in self.stops:
+            self.order.remove(self.slot[name])
+        self._ensure([name])
+        self.order[0] = self.slot[name]
+
+    def repair(self, budget=None):
+        """2-opt / Or-opt on the current order for at most `budget` seconds."""
+        deadline = time.perf_counter() + (self.repair_budget if budget is None else budget)
+        while time.perf_counter() < deadline:
+            improved = two_opt(self.rows, self.order, deadline)
+            improved = or_opt(self.rows, self.order, deadline) or improved
+            if not improved:
+                break
+
+    def apply(self, event):
+        """
+        Handle one event dict {"type": "add" | "remove" | "position", "location": name}
+        and return a report with the new cost, pending stop count and latency in ms.
+        A bad event (unknown type or location) leaves the route untouched and
+        its report carries an "error" message instead.
+        """
+        begin = time.perf_counter()
+        kind, name = event.get("type"), event.get("location")
+        error = None
+        if kind not in EVENT_TYPES:
+            error = f"Unknown event type '{kind}', expected one of {EVENT_TYPES}"
+        elif not isinstance(name, str) or name not in self.store.csr().index:
+            error = f"Unknown location {name!r}"
+        else:
+            self._refresh()
+            if kind == "add":
+                self.add(name)
+            elif kind == "remove":
+                self.remove(name)
+            else:
+                self.move_vehicle(name)
+            self.repair()
+            self._compact()
+
+        ms = (time.perf_counter() - begin) * 1000
+        self.events += 1
+        self.latency.observe(ms)
+        if instrumentation.ENABLED:
+            instrumentation.observe("live.event_ms", ms)
+        report = {"type": kind, "location": name, "cost": self.cost, "stops": len(self.order) - 2, "latency_ms": ms}
+        if error:
+            report["error"] = error
+        return report
+
+    def process(self, events):
+        """Apply a stream of events lazily, yielding one report per event."""
+        for event in events:
+            yield self.apply(event)
+
+    # -- state -- #
+
+    @property
+    def route(self):
+        return [self.names[a] for a in self.order]
+
+    @property
+    def stops(self):
+        return [self.names[a] for a in self.order[1:-1]]
+
+    @property
+    def cost(self):
+        return tour_cost(self.rows, self.order)
+
+    def stats(self):
+        return {"events": self.events, "stops": len(self.order) - 2, "cached_locations": len(self.names),
+                "latency_ms": self.latency.snapshot()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-optimise a live multi-stop route from an event stream")
+    parser.add_argument("events", nargs="?", default="-",
+                        help='JSON lines like {"type": "add", "location": "KIIT Square"} (default: stdin)')
+    parser.add_argument("--start", default="Master Canteen Square", help="vehicle position / depot")
+    parser.add_argument("--end", help="fixed end of the route (default: back to --start)")
+    parser.add_argument("--stops", nargs="*", default=[], help="initial stops")
+    parser.add_argument("--metric", default="distance", choices=("distance", "time", "fuel_cost"))
+    parser.add_argument("--graph", default=DEFAULT_GRAPH_FILE)
+    parser.add_argument("--repair-ms", type=float, default=DEFAULT_REPAIR_BUDGET * 1000,
+                        help="local search budget per event")
+    args = parser.parse_args()
+
+    tour = LiveTour(args.start, args.stops, args.end, args.metric, args.graph, args.repair_ms / 1000)
+    stream = sys.stdin if args.events == "-" else open(args.events)
+    try:
+        for number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"⚠️ Skipping line {number}: {e}", file=sys.stderr)
+                continue
+            if not isinstance(event, dict):
+                print(f"⚠️ Skipping line {number}: expected a JSON object", file=sys.stderr)
+                continue
+            report = tour.apply(event)
+            print(json.dumps(dict(report, route=tour.route)), flush=True)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    summary = tour.stats()["latency_ms"]
+    print(f"⚡ {tour.events} events | p50 {summary['p50'] or 0:.2f} ms | max {summary['max']:.2f} ms", file=sys.stderr)
@@ -0,0 +1,132 @@
+import heapq
+import numpy as np
+from .csr_graph import METRICS
+from .dijkstra import dijkstra_column
+from .graph_store import DEFAULT_GRAPH_FILE, get_csr
+
+
+def _dominated(cost, front):
+    """True if some label in `front` is at least as good as `cost` on every metric."""
+    d, t, f = cost
+    for a, b, c in front:
+        if a <= d and b <= t and c <= f:
+            return True
+    return False
+
+
+def pareto_csr(csr, source, target, max_labels_per_node=None, stats=None):
+    """
+    Multi-criteria label-setting search (Martins' algorithm) on a CSRGraph.
+    A label is a (distance, time, fuel_cost) vector for one route to a node.
+    Labels are settled in lexicographic order, so a settled label can never
+    be dominated by a later one; a new label is dropped when a settled label
+    at its node, or at the target, already dominates it.
+    Returns [(cost vector, id path), ...], the full Pareto front.
+    `max_labels_per_node` caps the labels kept per node: a safety valve for
+    large graphs that makes the front approximate once it kicks in.
+    """
+    offsets = csr.offsets
+    targets = csr.targets
+    weights = csr.weights
+    settled = {}
+    labels = [((0.0, 0.0, 0.0), source, -1)]  # (cost, node, parent label)
+    queue = [((0.0, 0.0, 0.0), 0)]
+    found = []
+    pushed = 1
+
+    while queue:
+        cost, li = heapq.heappop(queue)
+        node = labels[li][1]
+        front = settled.setdefault(node, [])
+        if _dominated(cost, front):
+            continue
+        if max_labels_per_node is not None and len(front) >= max_labels_per_node:
+            continue
+        front.append(cost)
+        if node == target:
+            found.append(li)
+            continue
+
+        target_front = settled.get(target, ())
+        d, t, f = cost
+        lo, hi = offsets[node], offsets[node + 1]
+        for v, (wd, wt, wf) in zip(targets[lo:hi].tolist(), weights[lo:hi].tolist()):
+            new = (d + wd, t + wt, f + wf)
+            if _dominated(new, settled.get(v, ())) or _dominated(new, target_front):
+                continue
+            labels.append((new, v, li))
+            heapq.heappush(queue, (new, len(labels) - 1))
+            pushed += 1
+
+    if stats is not None:
+        stats["labels"] = pushed
+        stats["settled"] = sum(len(front) for front in settled.values())
+
+    routes = []
+    for li in found:
+        cost, path = labels[li][0], []
+        while li != -1:
+            _, node, li = labels[li]
+            path.append(node)
+        path.reverse()
+        routes.append((cost, path))
+    return routes
+
+
+def pareto_routes(start, end, filename=DEFAULT_GRAPH_FILE, max_labels_per_node=None, stats=None):
+    """
+    Every Pareto-optimal route between two locations over distance, time
+    and fuel_cost at once: no returned route is beaten on all three by
+    another. Returns a list of dicts (one key per metric plus "path"),
+    sorted by distance. Empty if the locations are not connected.
+    """
+    csr = get_csr(filename)
+    if start not in csr.index or end not in csr.index:
+        return []
+    front = pareto_csr(csr, csr.index[start], csr.index[end], max_labels_per_node, stats)
+    routes = [
+        dict(zip(METRICS, cost), path=[csr.names[i] for i in path])
+        for cost, path in front
+    ]
+    routes.sort(key=lambda r: tuple(r[m] for m in METRICS))
+    return routes
+
+
+def weighted_route(start, end, weights, filename=DEFAULT_GRAPH_FILE):
+    """
+    Fast path: a single route minimising a weighted sum of the metrics,
+    e.g. weights={"time": 1.0, "fuel_cost": 10.0}. One Dijkstra instead of
+    a Pareto search; with positive weights the result is always on the
+    Pareto front. Weights must be non-negative and not all zero (a negative
+    mix breaks Dijkstra). Returns the same dict shape as pareto_routes plus
+    "score", or None if the locations are not connected.
+    """
+    unknown = set(weights) - set(METRICS)
+    if unknown:
+        raise ValueError(f"Unknown metrics {sorted(unknown)}, expected some of {METRICS}")
+    mix = np.array([float(weights.get(m, 0.0)) for m in METRICS])
+    if not np.all(np.isfinite(mix)) or np.any(mix < 0):
+        raise ValueError(f"Metric weights must be finite and non-negative, got {dict(weights)}")
+    if not mix.any():
+        raise ValueError("At least one metric weight must be positive")
+    csr = get_csr(filename)
+    if start not in csr.index or end not in csr.index:
+        return None
+    score, path = dijkstra_column(csr, csr.weights @ mix, csr.index[start], csr.index[end])
+    if not path:
+        return None
+    route = {m: csr.path_cost(path, m) for m in METRICS}
+    route["path"] = [csr.names[i] for i in path]
+    route["score"] = score
+    return route
+
+
+if __name__ == "__main__":
+    start, end = "Airport (BPI)", "Infocity"
+    front = pareto_routes(start, end)
+    print(f"🧭 {len(front)} Pareto-optimal routes from {start} to {end}:")
+    for r in front:
+        print(f"  {r['distance']:6.2f} km  {r['time']:6.2f} min  fuel {r['fuel_cost']:5.2f}   " + " → ".join(r["path"]))
+
+    best = weighted_route(start, end, {"time": 1.0, "fuel_cost": 10.0})
+    print(f"⚖️  Weighted (time + 10 × fuel): {best['time']:.2f} min, fuel {best['fuel_cost']:.2f}")
@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ROUTES = 4096
+DEFAULT_MAX_TOURS = 256
+
+
+class RouteCache:
+    """
+    Bounded LRU cache with an optional time-to-live.
+    Keys start with (graph filepath, graph version); when a lookup sees a
+    newer version for a file, every entry of the older version is dropped,
+    so results computed on an old graph (or old edge weights) are never
+    served. Values are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAX_ROUTES, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl  # seconds, None = no expiry
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._versions = {}  # filepath -> latest graph version seen
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_version(self, key):
+        filepath, version = key[0], key[1]
+        seen = self._versions.get(filepath)
+        if seen == version:
+            return
+        self._versions[filepath] = version
+        if seen is not None:
+            stale = [k for k in self._entries if k[0] == filepath and k[1] != version]
+            for k in stale:
+                del self._entries[k]
+            self.invalidations += len(stale)
+
+    def get(self, key, default=None):
+        with self._lock:
+            self._check_version(key)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            stored_at, value = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._check_version(key)
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+# Process-wide caches used by find_optimal_route and plan_tour.
+route_cache = RouteCache(DEFAULT_MAX_ROUTES)
+tour_cache = RouteCache(DEFAULT_MAX_TOURS)
+
+
+def cache_stats():
+    return {"routes": route_cache.stats(), "tours": tour_cache.stats()}
+
+
+def clear_caches():
+    route_cache.clear()
+    tour_cache.clear()
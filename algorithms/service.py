@@ -0,0 +1,355 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+from .csr_graph import METRICS
+from .dijkstra import ROUTING_METHODS, TIME_DEPENDENT_METHODS, find_optimal_route
+from .distance_matrix import distance_matrix
+from .graph_store import DEFAULT_GRAPH_FILE, get_csr
+from .time_dependent import parse_clock
+from .tsp_solver import SOLVERS, plan_tour
+from utils import instrumentation
+
+# Upper bucket edges in milliseconds; the last bucket catches everything slower.
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+MAX_BODY_BYTES = 1 << 20
+MAX_TIME_BUDGET = 60.0  # seconds per TSP solve
+
+
+class LatencyHistogram(instrumentation.Histogram):
+    """Request latency histogram; snapshot keys carry their unit (mean_ms, p95_ms, ...)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        super().__init__(buckets)
+
+    def snapshot(self):
+        snap = super().snapshot()
+        return {
+            "count": snap["count"],
+            **{f"{k}_ms": snap[k] for k in ("mean", "p50", "p95", "p99", "max")},
+            "buckets": {f"{label}ms": n for label, n in snap["buckets"].items()},
+        }
+
+
+class BadRequest(Exception):
+    pass
+
+
+# ---------------- Worker-side solves (run in the process pool) ---------------- #
+
+def _init_worker(graph_file, instrumented):
+    if instrumented:
+        instrumentation.enable()
+    get_csr(graph_file)  # load once so every request finds the graph warm
+
+
+def _instrumented_call(fn, *args):
+    """Run fn in a worker and ship the instrumentation it recorded back with the result."""
+    return fn(*args), instrumentation.drain()
+
+
+def _solve_route(graph_file, start, end, metric, method, depart=None):
+    stats = {}
+    cost, path = find_optimal_route(start, end, metric, method=method, stats=stats, filename=graph_file, depart=depart)
+    return {"cost": _finite(cost), "path": path, "settled": stats.get("settled"), "cached": stats.get("cached", False)}
+
+
+def _solve_tsp(graph_file, locations, start, end, metric, method, time_budget, depart=None):
+    return plan_tour(locations, start, end, metric, method, time_budget, filename=graph_file, depart=depart)
+
+
+def _solve_matrix(graph_file, nodes, metric):
+    matrix = distance_matrix(nodes, metric, filename=graph_file)
+    return {"nodes": matrix.nodes, "matrix": [[_finite(c) for c in row] for row in matrix.rows()]}
+
+
+def _finite(value):
+    """JSON has no Infinity: unreachable costs are reported as null."""
+    return value if value is None or math.isfinite(value) else None
+
+
+# ---------------- Service ---------------- #
+
+class RoutingService:
+    """
+    Local asyncio HTTP front end for the routing functions.
+    The graph is loaded once in this process (for request validation) and
+    once per pool worker, and the mtime-aware GraphStore keeps it current.
+    CPU-bound solves run in a ProcessPoolExecutor; at most `max_concurrency`
+    are dispatched at a time and the rest wait. Identical requests that
+    arrive while one is already being solved share its result instead of
+    solving again.
+
+    Endpoints (GET query string or POST JSON body):
+      /route   start, end, metric, method, depart
+               (depart: minutes after midnight or "HH:MM", metric "time" only)
+      /tsp     locations (list), start, end, metric, method, time_budget, depart   (POST)
+      /matrix  nodes (list), metric                                                (POST)
+      /stats   latency histograms and counters
+      /metrics instrumentation counters / histograms, Prometheus text format
+               (needs ROUTE_INSTRUMENTATION=1 or --instrument)
+      /health
+    """
+
+    def __init__(self, graph_file=DEFAULT_GRAPH_FILE, workers=None, max_concurrency=None):
+        self.graph_file = graph_file
+        self.workers = workers or os.cpu_count() or 1
+        self.max_concurrency = max_concurrency or self.workers * 2
+        self.pool = None
+        self.semaphore = None
+        self.inflight = {}
+        self.histograms = {}
+        self.counters = {"requests": 0, "coalesced": 0, "errors": 0, "solves": 0}
+        self.started = time.time()
+
+    async def start(self):
+        get_csr(self.graph_file)
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                        initargs=(self.graph_file, instrumentation.ENABLED))
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    # -- request handling -- #
+
+    async def dispatch(self, path, params):
+        """Route one request; returns (status, payload)."""
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/stats":
+            return 200, self.stats()
+        if path == "/metrics":
+            return 200, instrumentation.prometheus_text()
+        handler = {"/route": self._route, "/tsp": self._tsp, "/matrix": self._matrix}.get(path)
+        if handler is None:
+            return 404, {"error": f"unknown endpoint {path}"}
+
+        begin = time.perf_counter()
+        self.counters["requests"] += 1
+        try:
+            status, payload = 200, await handler(params)
+        except BadRequest as e:
+            status, payload = 400, {"error": str(e)}
+        except Exception as e:
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+        if status != 200:
+            self.counters["errors"] += 1
+        self.histograms.setdefault(path, LatencyHistogram()).observe((time.perf_counter() - begin) * 1000)
+        return status, payload
+
+    async def _route(self, params):
+        start, end = self._location(params, "start"), self._location(params, "end")
+        metric = self._metric(params)
+        method = params.get("method", "dijkstra")
+        if method not in ROUTING_METHODS:
+            raise BadRequest(f"unknown method '{method}', expected one of {ROUTING_METHODS}")
+        depart = self._depart(params, metric)
+        if depart is not None and method not in TIME_DEPENDENT_METHODS:
+            raise BadRequest(f"'depart' needs method in {TIME_DEPENDENT_METHODS}")
+        return await self._solve(("route", start, end, metric, method, depart),
+                                 _solve_route, self.graph_file, start, end, metric, method, depart)
+
+    async def _tsp(self, params):
+        locations = self._locations(params, "locations")
+        start = self._location(params, "start") if params.get("start") else None
+        end = self._location(params, "end") if params.get("end") else None
+        metric = self._metric(params)
+        method = params.get("method", "auto")
+        if method != "auto" and method not in SOLVERS:
+            raise BadRequest(f"unknown TSP method '{method}'")
+        time_budget = self._time_budget(params)
+        depart = self._depart(params, metric)
+        key = ("tsp", tuple(locations), start, end, metric, method, time_budget, depart)
+        result = await self._solve(key, _solve_tsp, self.graph_file, locations, start, end, metric, method,
+                                   time_budget, depart)
+        return dict(result, cost=_finite(result["cost"]))
+
+    async def _matrix(self, params):
+        nodes = self._locations(params, "nodes")
+        metric = self._metric(params)
+        return await self._solve(("matrix", tuple(nodes), metric), _solve_matrix, self.graph_file, nodes, metric)
+
+    async def _solve(self, key, fn, *args):
+        """Run fn(*args) in the pool, sharing the result with identical in-flight requests."""
+        task = self.inflight.get(key)
+        if task is not None:
+            self.counters["coalesced"] += 1
+        else:
+            task = asyncio.ensure_future(self._run(fn, *args))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        # shield: one client disconnecting must not cancel the solve for the others
+        return await asyncio.shield(task)
+
+    async def _run(self, fn, *args):
+        async with self.semaphore:
+            self.counters["solves"] += 1
+            loop = asyncio.get_running_loop()
+            if not instrumentation.ENABLED:
+                return await loop.run_in_executor(self.pool, fn, *args)
+            result, recorded = await loop.run_in_executor(self.pool, _instrumented_call, fn, *args)
+            instrumentation.merge(recorded)
+            return result
+
+    # -- validation -- #
+
+    def _location(self, params, field):
+        name = params.get(field)
+        if not name:
+            raise BadRequest(f"missing '{field}'")
+        if not isinstance(name, str):
+            raise BadRequest(f"'{field}' must be a single location name")
+        if name not in get_csr(self.graph_file).index:
+            raise BadRequest(f"unknown location '{name}'")
+        return name
+
+    def _locations(self, params, field):
+        names = params.get(field)
+        if isinstance(names, str):
+            names = [names]
+        if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+            raise BadRequest(f"'{field}' must be a list of location names")
+        if len(names) < 2:
+            raise BadRequest(f"'{field}' needs at least two locations")
+        index = get_csr(self.graph_file).index
+        unknown = [n for n in names if n not in index]
+        if unknown:
+            raise BadRequest(f"unknown locations {unknown}")
+        return list(names)
+
+    @staticmethod
+    def _time_budget(params):
+        value = params.get("time_budget", 1.0)
+        try:
+            budget = float(value)
+        except (TypeError, ValueError):
+            raise BadRequest(f"'time_budget' must be a number of seconds, got {value!r}")
+        if not 0 < budget <= MAX_TIME_BUDGET:
+            raise BadRequest(f"'time_budget' must be in (0, {MAX_TIME_BUDGET}] seconds")
+        return budget
+
+    @staticmethod
+    def _depart(params, metric):
+        """Optional departure time (minutes after midnight or "HH:MM") for time-dependent travel times."""
+        depart = params.get("depart")
+        if depart is None or depart == "":
+            return None
+        if metric != "time":
+            raise BadRequest("'depart' only applies to metric 'time'")
+        try:
+            return parse_clock(depart)
+        except (TypeError, ValueError):
+            raise BadRequest(f"bad departure time '{depart}', expected minutes after midnight or HH:MM")
+
+    @staticmethod
+    def _metric(params):
+        metric = params.get("metric", "distance")
+        if metric not in METRICS:
+            raise BadRequest(f"unknown metric '{metric}', expected one of {METRICS}")
+        return metric
+
+    def stats(self):
+        return {
+            "uptime_s": time.time() - self.started,
+            "workers": self.workers,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": len(self.inflight),
+            **self.counters,
+            "latency": {path: h.snapshot() for path, h in sorted(self.histograms.items())},
+            **({"instrumentation": instrumentation.snapshot()} if instrumentation.ENABLED else {}),
+        }
+
+    # -- HTTP/1.1 (keep-alive, Content-Length bodies) -- #
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {"error": "request body too large"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                url = urlsplit(target)
+                params = {k: v[0] if len(v) == 1 else v for k, v in parse_qs(url.query).items()}
+                if method == "POST" and body:
+                    try:
+                        params.update(json.loads(body))
+                    except (ValueError, TypeError):
+                        await self._respond(writer, 400, {"error": "body is not a JSON object"})
+                        continue
+
+                status, payload = await self.dispatch(url.path, params)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep_alive=True):
+        if isinstance(payload, str):  # /metrics is plain text
+            body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large"}.get(status, "Error")
+        head = (
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+
+async def serve(host="127.0.0.1", port=8080, graph_file=DEFAULT_GRAPH_FILE, workers=None, max_concurrency=None):
+    service = RoutingService(graph_file, workers, max_concurrency)
+    await service.start()
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    print(f"🚚 Routing service on http://{host}:{port} "
+          f"({service.workers} workers, max {service.max_concurrency} concurrent solves)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local HTTP routing service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--graph", default=DEFAULT_GRAPH_FILE, help="graph file (.json or .npz)")
+    parser.add_argument("--workers", type=int, help="solver processes (default: CPU count)")
+    parser.add_argument("--max-concurrency", type=int, help="solves dispatched at once (default: 2 x workers)")
+    parser.add_argument("--instrument", action="store_true", help="record search / stage metrics for /metrics")
+    args = parser.parse_args()
+    if args.instrument:
+        instrumentation.enable()
+    try:
+        asyncio.run(serve(args.host, args.port, args.graph, args.workers, args.max_concurrency))
+    except KeyboardInterrupt:
+        print("👋 Routing service stopped")
@@ -0,0 +1,163 @@
+import heapq
+from itertools import repeat
+import numpy as np
+from .astar import _heuristic
+from .dijkstra import rebuild_path
+from .graph_store import DEFAULT_GRAPH_FILE, get_csr
+
+DAY_MINUTES = 24 * 60
+
+
+def parse_clock(value):
+    """
+    Departure time as minutes after midnight, from a number in [0, 1440)
+    or an "HH:MM" string (HH 0-23, MM 0-59). Anything else is a ValueError.
+    """
+    if isinstance(value, str):
+        text = value.strip()
+        hours, colon, minutes = text.partition(":")
+        if colon:
+            if not (hours.isdigit() and minutes.isdigit() and len(hours) <= 2 and len(minutes) == 2) \
+                    or int(hours) > 23 or int(minutes) > 59:
+                raise ValueError(f"Bad clock time '{value}', expected HH:MM with HH 0-23 and MM 0-59")
+            return float(int(hours) * 60 + int(minutes))
+        value = text
+    try:
+        minutes = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Bad departure time {value!r}, expected minutes after midnight or HH:MM") from None
+    if not 0 <= minutes < DAY_MINUTES:
+        raise ValueError(f"Departure time {value!r} is outside the day, expected 0 <= minutes < {DAY_MINUTES}")
+    return minutes
+
+
+def format_clock(minutes):
+    """Minutes after midnight as "HH:MM" (wrapping past midnight)."""
+    minutes = int(round(minutes)) % DAY_MINUTES
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def travel_time(base, factors, depart):
+    """
+    Minutes to drive an arc whose free-flow time is `base`, leaving at
+    `depart` (minutes after midnight). `factors` are the speed multipliers
+    of the arc's profile, equal time slices over one day; they must all
+    be positive (utils.graph_io checks this when the graph is loaded).
+    The car covers the arc at the speed of whichever slice it is in, so
+    leaving later can never mean arriving earlier (the FIFO property that
+    keeps Dijkstra on arrival times exact). A plain "time at departure
+    slice" lookup would break that at every slice boundary.
+    """
+    slices = len(factors)
+    width = DAY_MINUTES / slices
+    t = depart
+    left = base  # free-flow minutes still to drive
+    k = int(t // width)
+    while True:
+        speed = factors[k % slices]
+        end = (k + 1) * width
+        if speed * (end - t) >= left:
+            return t + left / speed - depart
+        left -= speed * (end - t)
+        t = end
+        k += 1
+
+
+def fastest_arc_times(csr):
+    """Per-arc lower bound on travel time over the whole day (free-flow time / best multiplier)."""
+    base = csr.metric_column("time")
+    if csr.profiles is None:
+        return base
+    best = np.append(csr.profiles.max(axis=1), 1.0)  # index -1 = constant speed
+    return base / best[csr.arc_profile]
+
+
+def _td_search(csr, source, depart, target=None, stop_at=None, h=None, stats=None):
+    """
+    Dijkstra (or A* with lower bound `h`) on arrival times from `source`
+    leaving at `depart`. Returns (dist, pred, reached) where dist holds
+    travel minutes from the departure and `reached` is the target's
+    travel time (inf if not reached or no target).
+    """
+    offsets = csr.offsets
+    targets = csr.targets
+    base = csr.metric_column("time")
+    profiles = csr.profiles.tolist() if csr.profiles is not None else []
+    arc_profile = csr.arc_profile
+    inf = float("inf")
+    dist = [inf] * csr.num_nodes
+    pred = [-1] * csr.num_nodes
+    remaining = set(stop_at) if stop_at is not None else None
+    settled = 0
+    reached = inf
+
+    dist[source] = 0.0
+    queue = [(h(source) if h else 0.0, 0.0, source)]
+    while queue:
+        _, cost, u = heapq.heappop(queue)
+        if cost > dist[u]:
+            continue
+        settled += 1
+        if u == target:
+            reached = cost
+            break
+        if remaining is not None:
+            remaining.discard(u)
+            if not remaining:
+                break
+
+        now = depart + cost
+        lo, hi = offsets[u], offsets[u + 1]
+        arc_profiles = arc_profile[lo:hi].tolist() if arc_profile is not None else repeat(-1)
+        for v, w, p in zip(targets[lo:hi].tolist(), base[lo:hi].tolist(), arc_profiles):
+            nd = cost + (travel_time(w, profiles[p], now) if p >= 0 else w)
+            if nd < dist[v]:
+                dist[v] = nd
+                pred[v] = u
+                heapq.heappush(queue, (nd + h(v) if h else nd, nd, v))
+
+    if stats is not None:
+        stats["settled"] = settled
+    return dist, pred, reached
+
+
+def td_route_csr(csr, source, target, depart, heuristic=True, stats=None):
+    """
+    Earliest-arrival route between two node ids leaving at `depart`
+    (minutes after midnight). Returns (travel minutes, id path).
+    With `heuristic` the search is A* with a great-circle bound calibrated
+    on the fastest speed each road reaches at any hour, so it stays
+    admissible whatever the departure time.
+    """
+    h = _heuristic(csr, target, "time_dependent", lambda: fastest_arc_times(csr)) if heuristic else None
+    _, pred, cost = _td_search(csr, source, depart, target=target, h=h, stats=stats)
+    if cost == float("inf"):
+        return cost, []
+    return cost, rebuild_path(pred, target, -1)
+
+
+def td_leg_times(csr, source, targets, depart):
+    """Travel minutes from one node id to each of `targets`, leaving at `depart`."""
+    dist, _, _ = _td_search(csr, source, depart, stop_at=set(targets))
+    return [dist[t] for t in targets]
+
+
+def td_route(start, end, depart, filename=DEFAULT_GRAPH_FILE, heuristic=True):
+    """
+    Fastest route between two location names when leaving at `depart`
+    (minutes after midnight or "HH:MM"), using the roads' speed profiles.
+    Returns (travel minutes, path of names).
+    """
+    csr = get_csr(filename)
+    if start not in csr.index or end not in csr.index:
+        return float("inf"), []
+    cost, path = td_route_csr(csr, csr.index[start], csr.index[end], parse_clock(depart), heuristic)
+    return cost, [csr.names[i] for i in path]
+
+
+if __name__ == "__main__":
+    start, end = "Airport (BPI)", "Infocity"
+    for clock in ("03:00", "08:30", "13:00", "18:00"):
+        minutes, path = td_route(start, end, clock)
+        arrive = format_clock(parse_clock(clock) + minutes)
+        print(f"🕒 Leave {clock} → arrive {arrive} ({minutes:.1f} min): " + " → ".join(path))
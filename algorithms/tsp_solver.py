@@ -1,7 +1,16 @@
-import json
 import itertools
-import os
-from .dijkstra import build_adjacency_list, dijkstra, load_city_graph
+import time
+import numpy as np
+from .dijkstra import dijkstra
+from .distance_matrix import distance_matrix
+from .graph_store import DEFAULT_GRAPH_FILE, get_store
+from .route_cache import tour_cache
+from .time_dependent import parse_clock, td_leg_times, td_route_csr
+from utils import instrumentation
+
+BRUTE_FORCE_MAX_STOPS = 8
+HELD_KARP_MAX_STOPS = 16
+HELD_KARP_HARD_LIMIT = 22  # 2^22 * 22 DP cells is already several GB
 
 
 def compute_path_cost(adjacency, path, weight_type="distance"):
@@ -9,39 +18,376 @@ def compute_path_cost(adjacency, path, weight_type="distance"):
     total = 0.0
     for i in range(len(path) - 1):
         start, end = path[i], path[i + 1]
-        cost, _ = dijkstra(adjacency, start, end)
+        cost, _ = dijkstra(adjacency, start, end, weight_type)
         total += cost
     return total
 
 
-def solve_tsp(locations, start=None, end=None, weight_type="distance"):
+def tour_cost(rows, order):
+    """Cost of an index route over a pairwise cost matrix (nested lists)."""
+    return sum(rows[order[k]][order[k + 1]] for k in range(len(order) - 1))
+
+
+# ---------------- Exact solvers ---------------- #
+# Every solver takes matrix rows plus the start index, end index (equal to
+# start for a closed tour) and the intermediate stop indices, and returns
+# (cost, [start, ..., end]).
+
+def brute_force_tour(rows, start, end, stops, time_budget=None):
+    """Try every permutation (only sensible for <= 8 stops)."""
+    best_order = [start] + list(stops) + [end]
+    best_cost = float("inf")
+    for perm in itertools.permutations(stops):
+        route = [start] + list(perm) + [end]
+        total_cost = tour_cost(rows, route)
+        if total_cost < best_cost:
+            best_cost = total_cost
+            best_order = route
+    return best_cost, best_order
+
+
+def held_karp_tour(rows, start, end, stops, time_budget=None):
+    """
+    Bitmask Held-Karp dynamic programme, O(k² 2^k) for k stops.
+    dp[mask, j] is the cheapest path leaving `start`, visiting exactly the
+    stops in `mask` and ending at stop j. Each subset-size layer is
+    relaxed with one vectorised NumPy operation per end stop.
+    """
+    k = len(stops)
+    if k == 0:
+        return rows[start][end], [start, end]
+    if k > HELD_KARP_HARD_LIMIT:
+        raise ValueError(f"Held-Karp supports at most {HELD_KARP_HARD_LIMIT} stops, got {k}")
+
+    C = np.asarray(rows, dtype=np.float64)
+    S = np.asarray(stops)
+    leg = C[np.ix_(S, S)]
+    full = 1 << k
+
+    dp = np.full((full, k), np.inf)
+    parent = np.full((full, k), -1, dtype=np.int8)
+    for j in range(k):
+        dp[1 << j, j] = C[start, S[j]]
+
+    masks = np.arange(full)
+    popcount = np.zeros(full, dtype=np.int64)
+    for b in range(k):
+        popcount += (masks >> b) & 1
+
+    for size in range(2, k + 1):
+        layer = masks[popcount == size]
+        for j in range(k):
+            bit = 1 << j
+            sel = layer[(layer & bit) != 0]
+            cand = dp[sel ^ bit] + leg[:, j]
+            best = np.argmin(cand, axis=1)
+            dp[sel, j] = cand[np.arange(len(sel)), best]
+            parent[sel, j] = best
+
+    final = dp[full - 1] + C[S, end]
+    j = int(np.argmin(final))
+    cost = float(final[j])
+
+    order = []
+    mask = full - 1
+    while j != -1:
+        order.append(stops[j])
+        prev = int(parent[mask, j])
+        mask ^= 1 << j
+        j = prev
+    order.reverse()
+    return cost, [start] + order + [end]
+
+
+# ---------------- Heuristic solver ---------------- #
+
+def nearest_neighbour_tour(rows, start, end, stops):
+    """Greedy construction: always drive to the closest unvisited stop."""
+    remaining = list(stops)
+    order = [start]
+    current = start
+    while remaining:
+        nxt = min(remaining, key=lambda s: rows[current][s])
+        remaining.remove(nxt)
+        order.append(nxt)
+        current = nxt
+    order.append(end)
+    return order
+
+
+def two_opt(rows, order, deadline):
+    """Reverse segments while it shortens the route (endpoints stay fixed)."""
+    n = len(order)
+    improved = False
+    for i in range(1, n - 2):
+        for j in range(i + 1, n - 1):
+            a, b = order[i - 1], order[i]
+            c, d = order[j], order[j + 1]
+            delta = rows[a][c] + rows[b][d] - rows[a][b] - rows[c][d]
+            if delta < -1e-9:
+                order[i:j + 1] = order[i:j + 1][::-1]
+                improved = True
+        if time.perf_counter() > deadline:
+            break
+    return improved
+
+
+def or_opt(rows, order, deadline, max_segment=3):
+    """Move chains of 1..max_segment stops to a cheaper position, optionally reversed."""
+    improved = False
+    for seg_len in range(1, max_segment + 1):
+        i = 1
+        while i + seg_len < len(order):
+            p, q = order[i - 1], order[i + seg_len]
+            first, last = order[i], order[i + seg_len - 1]
+            removal_gain = rows[p][first] + rows[last][q] - rows[p][q]
+
+            best_delta, best_move = -1e-9, None
+            for j in range(len(order) - 1):
+                if i - 1 <= j < i + seg_len:
+                    continue
+                x, y = order[j], order[j + 1]
+                forward = rows[x][first] + rows[last][y] - rows[x][y] - removal_gain
+                backward = rows[x][last] + rows[first][y] - rows[x][y] - removal_gain
+                if forward < best_delta:
+                    best_delta, best_move = forward, (j, False)
+                if backward < best_delta:
+                    best_delta, best_move = backward, (j, True)
+
+            if best_move is not None:
+                j, reverse = best_move
+                segment = order[i:i + seg_len]
+                if reverse:
+                    segment.reverse()
+                rest = order[:i] + order[i + seg_len:]
+                insert_at = j + 1 if j < i else j + 1 - seg_len
+                order[:] = rest[:insert_at] + segment + rest[insert_at:]
+                improved = True
+            i += 1
+            if time.perf_counter() > deadline:
+                return improved
+    return improved
+
+
+def heuristic_tour(rows, start, end, stops, time_budget=1.0):
+    """Nearest-neighbour construction followed by 2-opt / Or-opt until no move helps or time runs out."""
+    deadline = time.perf_counter() + time_budget
+    order = nearest_neighbour_tour(rows, start, end, stops)
+    while time.perf_counter() < deadline:
+        improved = two_opt(rows, order, deadline)
+        improved = or_opt(rows, order, deadline) or improved
+        if not improved:
+            break
+    return tour_cost(rows, order), order
+
+
+SOLVERS = {
+    "brute_force": brute_force_tour,
+    "held_karp": held_karp_tour,
+    "heuristic": heuristic_tour,
+}
+
+
+def pick_solver(num_stops):
+    """Default solver for a given number of intermediate stops."""
+    if num_stops <= HELD_KARP_MAX_STOPS:
+        return "held_karp"
+    return "heuristic"
+
+
+# ---------------- Bounds ---------------- #
+
+def _mst_weight(rows, nodes):
+    """Prim's MST over `nodes` using min(c[i][j], c[j][i]) as the edge weight."""
+    if len(nodes) < 2:
+        return 0.0
+    inf = float("inf")
+    best = {v: inf for v in nodes[1:]}
+    u = nodes[0]
+    total = 0.0
+    while best:
+        for v in best:
+            w = min(rows[u][v], rows[v][u])
+            if w < best[v]:
+                best[v] = w
+        u = min(best, key=best.get)
+        total += best.pop(u)
+    return total
+
+
+def lower_bound(rows, start, end, stops):
     """
-    Simple brute-force TSP for small sets of locations (<=8 recommended).
+    Cheap lower bound on the optimal tour.
+    Open tours: any Hamiltonian path is a spanning tree, so MST <= cost.
+    Closed tours: 1-tree bound (MST over the stops plus the two cheapest
+    edges back to the start).
     """
-    graph = load_city_graph()
-    adjacency = build_adjacency_list(graph, weight_type=weight_type)
+    if start != end:
+        return _mst_weight(rows, list(dict.fromkeys([start] + list(stops) + [end])))
+    if not stops:
+        return 0.0
+    links = sorted(min(rows[start][s], rows[s][start]) for s in stops)
+    if len(links) == 1:
+        return 2 * links[0]
+    return _mst_weight(rows, list(stops)) + links[0] + links[1]
+
+
+# ---------------- Time-dependent tours ---------------- #
+
+def _plan_timed_tour(csr, start, end, stops, method, time_budget, depart):
+    """
+    plan_tour with a departure time (weight_type="time" only).
+    1. A visiting order is solved on leg times that all leave at `depart`.
+    2. Every leg is then priced when the vehicle actually starts it (the
+       arrival time at the previous stop), and stops are moved one at a
+       time while that lowers the arrival at the end, within `time_budget`.
+    Returns the plan_tour dict plus depart and arrivals (minutes after
+    midnight at each stop of the route); no lower bound is computed.
+    """
+    deadline = time.perf_counter() + time_budget
+    nodes = list(dict.fromkeys([start] + stops + [end]))
+    ids = [csr.index[n] for n in nodes]
+    pos = {name: i for i, name in enumerate(nodes)}
+
+    rows = [td_leg_times(csr, s, ids, depart) for s in ids]
+    if method == "auto":
+        method = pick_solver(len(stops))
+    cost, order = SOLVERS[method](rows, pos[start], pos[end], [pos[s] for s in stops], time_budget=time_budget)
+    if cost == float("inf"):
+        return {"cost": cost, "route": None, "method": method, "lower_bound": None, "gap": None,
+                "depart": depart, "arrivals": None}
+
+    legs = {}  # (from, to, leave time) -> minutes; prefixes of candidate orders hit this
+
+    def schedule(route):
+        t = depart
+        times = [t]
+        for a, b in zip(route, route[1:]):
+            key = (a, b, t)
+            if key not in legs:
+                legs[key] = td_route_csr(csr, ids[a], ids[b], t)[0]
+            t += legs[key]
+            times.append(t)
+        return times
+
+    times = schedule(order)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(1, len(order) - 1):
+            for j in range(1, len(order) - 1):
+                if i == j:
+                    continue
+                candidate = order[:]
+                candidate.insert(j, candidate.pop(i))
+                candidate_times = schedule(candidate)
+                if candidate_times[-1] < times[-1] - 1e-9:
+                    order, times, improved = candidate, candidate_times, True
+            if time.perf_counter() >= deadline:
+                break
+    if instrumentation.ENABLED:
+        instrumentation.inc("tsp.timed_tours")
+        instrumentation.observe("tsp.timed_legs", len(legs))
 
+    return {
+        "cost": times[-1] - depart,
+        "route": [nodes[i] for i in order],
+        "method": method,
+        "lower_bound": None,
+        "gap": None,
+        "depart": depart,
+        "arrivals": times,
+    }
+
+
+# ---------------- Public API ---------------- #
+
+def plan_tour(locations, start=None, end=None, weight_type="distance", method="auto", time_budget=1.0,
+              filename=DEFAULT_GRAPH_FILE, cache=True, depart=None):
+    """
+    Solve a multi-stop route and report how good it is.
+    Without `end` the tour returns to `start` (closed); with `end` it is an
+    open path from `start` to `end`. `method` is "auto" or a key of SOLVERS.
+    Returns a dict with cost, route (location names, None when no connected
+    route exists), method, lower_bound and gap (relative to the bound).
+    With `depart` (minutes after midnight or "HH:MM", weight_type="time")
+    each leg is priced at the hour it is actually driven using the roads'
+    speed profiles; see _plan_timed_tour.
+    Results are cached per graph version in `tour_cache`, keyed by the set
+    of stops (their order in `locations` does not matter).
+    """
     if not start:
         start = locations[0]
+    end_name = end or start
+    stops = [loc for loc in dict.fromkeys(locations) if loc != start and loc != end_name]
+    if depart is not None:
+        if weight_type != "time":
+            raise ValueError(f"A departure time only applies to weight_type='time', not '{weight_type}'")
+        depart = parse_clock(depart)
 
-    stops = [loc for loc in locations if loc != start]
-    best_order = None
-    best_cost = float("inf")
+    store = get_store(filename)
+    csr = store.csr()  # refresh so the version below is current
+    key = (store.filepath, store.version, weight_type, start, end_name, frozenset(stops), method, time_budget, depart)
+    if cache:
+        hit = tour_cache.get(key)
+        if hit is not None:
+            return dict(hit, route=list(hit["route"]) if hit["route"] is not None else None)
 
-    for perm in itertools.permutations(stops):
-        route = [start] + list(perm)
-        if end:
-            route.append(end)
-        else:
-            route.append(start)  # return to start
+    if depart is not None:
+        result = _plan_timed_tour(csr, start, end_name, stops, method, time_budget, depart)
+        if cache:
+            tour_cache.put(key, dict(result, route=tuple(result["route"]) if result["route"] is not None else None))
+        return result
 
-        total_cost = compute_path_cost(adjacency, route, weight_type)
+    # Every leg cost comes from one matrix: each stop is solved once.
+    with instrumentation.stage("tsp_matrix"):
+        matrix = distance_matrix([start] + stops + [end_name], weight_type, filename=filename)
+    rows = matrix.rows()
+    pos = matrix.position
+    stop_idx = [pos[s] for s in stops]
 
-        if total_cost < best_cost:
-            best_cost = total_cost
-            best_order = route
+    if method == "auto":
+        method = pick_solver(len(stops))
+    solver = SOLVERS[method]
+    with instrumentation.stage("tsp_solve"):
+        cost, order = solver(rows, pos[start], pos[end_name], stop_idx, time_budget=time_budget)
+    if instrumentation.ENABLED:
+        n = len(matrix.nodes)
+        instrumentation.inc("tsp.tours")
+        instrumentation.inc(f"tsp.method.{method}")
+        instrumentation.observe("tsp.stops", len(stops))
+        instrumentation.observe("tsp.legs", n * (n - 1))  # ordered stop pairs the solver can price
+
+    if cost == float("inf"):
+        result = {"cost": cost, "route": None, "method": method, "lower_bound": None, "gap": None}
+    else:
+        exact = method in ("brute_force", "held_karp")
+        with instrumentation.stage("tsp_bound"):
+            bound = cost if exact else lower_bound(rows, pos[start], pos[end_name], stop_idx)
+        gap = 0.0 if cost == bound else (cost - bound) / bound
+        result = {
+            "cost": cost,
+            "route": [matrix.nodes[i] for i in order],
+            "method": method,
+            "lower_bound": bound,
+            "gap": gap,
+        }
+
+    if cache:
+        tour_cache.put(key, dict(result, route=tuple(result["route"]) if result["route"] is not None else None))
+    return result
 
-    return best_cost, best_order
+
+def solve_tsp(locations, start=None, end=None, weight_type="distance", method="auto", time_budget=1.0,
+              filename=DEFAULT_GRAPH_FILE, depart=None):
+    """
+    Best visiting order for multiple stops.
+    Exact Held-Karp up to HELD_KARP_MAX_STOPS stops, nearest-neighbour plus
+    2-opt/Or-opt local search beyond that. With `depart` (weight_type="time")
+    legs are evaluated at their actual arrival times. Returns (cost, route).
+    """
+    result = plan_tour(locations, start, end, weight_type, method, time_budget, filename, depart=depart)
+    return result["cost"], result["route"]
 
 
 if __name__ == "__main__":
@@ -60,4 +406,3 @@ if __name__ == "__main__":
     print("🚛 Optimal delivery route (multi-stop):")
     print(" → ".join(best_route))
     print(f"Total {metric}: {best_cost:.2f}")
-
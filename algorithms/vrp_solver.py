@@ -0,0 +1,353 @@
+import math
+import time
+from .csr_graph import METRICS
+from .distance_matrix import distance_matrix
+from .graph_store import DEFAULT_GRAPH_FILE, get_csr
+from .tsp_solver import or_opt, tour_cost, two_opt
+
+
+class _Fleet:
+    """
+    Working state for the VRP heuristics, all in matrix index space.
+    Index 0 is the depot; every route is stored without the depot at either end.
+    """
+
+    def __init__(self, rows, time_rows, demand, capacity, max_time, service_time):
+        self.rows = rows
+        self.time_rows = time_rows
+        self.demand = demand
+        self.capacity = capacity if capacity is not None else math.inf
+        self.max_time = max_time if max_time is not None else math.inf
+        self.service_time = service_time
+        self.routes = []
+
+    def load(self, route):
+        return sum(self.demand[i] for i in route)
+
+    def duration(self, route):
+        return tour_cost(self.time_rows, [0] + route + [0]) + self.service_time * len(route)
+
+    def cost(self, route):
+        return tour_cost(self.rows, [0] + route + [0])
+
+    def feasible(self, route):
+        return self.load(route) <= self.capacity and self.duration(route) <= self.max_time + 1e-9
+
+
+# ---------------- Construction ---------------- #
+
+def _savings_routes(fleet, customers):
+    """Clarke-Wright parallel savings: start with one route per stop and merge the best pairs."""
+    rows = fleet.rows
+    routes = {i: [i] for i in customers}
+    route_of = {i: i for i in customers}
+
+    savings = []
+    for a in range(len(customers)):
+        i = customers[a]
+        for b in range(a + 1, len(customers)):
+            j = customers[b]
+            saving = rows[i][0] + rows[0][j] - rows[i][j]
+            if saving > 0:
+                savings.append((saving, i, j))
+    savings.sort(reverse=True)
+
+    for _, i, j in savings:
+        ri, rj = route_of[i], route_of[j]
+        if ri == rj:
+            continue
+        a, b = routes[ri], routes[rj]
+        # i must end route a and j must start route b (reversals allowed)
+        if a[-1] != i:
+            if a[0] != i:
+                continue
+            a = a[::-1]
+        if b[0] != j:
+            if b[-1] != j:
+                continue
+            b = b[::-1]
+        merged = a + b
+        if not fleet.feasible(merged):
+            continue
+        routes[ri] = merged
+        del routes[rj]
+        for k in b:
+            route_of[k] = ri
+
+    return list(routes.values())
+
+
+def _sweep_routes(fleet, customers, csr, names):
+    """Sweep construction: sort stops by bearing around the depot and fill vehicles in order."""
+    dx, dy = csr.x[csr.index[names[0]]], csr.y[csr.index[names[0]]]
+
+    def bearing(i):
+        k = csr.index[names[i]]
+        return math.atan2(csr.y[k] - dy, csr.x[k] - dx)
+
+    routes, current = [], []
+    for i in sorted(customers, key=bearing):
+        candidate = _cheapest_insertion(fleet.rows, current, i)
+        if current and not fleet.feasible(candidate):
+            routes.append(current)
+            candidate = [i]
+        current = candidate
+    if current:
+        routes.append(current)
+    return routes
+
+
+def _cheapest_insertion(rows, route, stop):
+    """Return a copy of `route` with `stop` inserted where it adds least cost."""
+    full = [0] + route + [0]
+    best_pos, best_delta = 0, math.inf
+    for p in range(len(full) - 1):
+        x, y = full[p], full[p + 1]
+        delta = rows[x][stop] + rows[stop][y] - rows[x][y]
+        if delta < best_delta:
+            best_pos, best_delta = p, delta
+    return route[:best_pos] + [stop] + route[best_pos:]
+
+
+def _insert_dropped(fleet, stops):
+    """
+    Put stops from routes that got no vehicle into the kept routes, each at
+    the cheapest position that keeps capacity and shift time. Returns the
+    stops that fit nowhere.
+    """
+    rows = fleet.rows
+    left = []
+    for stop in sorted(stops, key=lambda i: fleet.demand[i], reverse=True):
+        best = None
+        best_delta = math.inf
+        for k, route in enumerate(fleet.routes):
+            if fleet.load(route) + fleet.demand[stop] > fleet.capacity:
+                continue
+            full = [0] + route + [0]
+            for p in range(len(full) - 1):
+                x, y = full[p], full[p + 1]
+                delta = rows[x][stop] + rows[stop][y] - rows[x][y]
+                if delta < best_delta and fleet.feasible(route[:p] + [stop] + route[p:]):
+                    best, best_delta = (k, p), delta
+        if best is None:
+            left.append(stop)
+        else:
+            k, p = best
+            fleet.routes[k].insert(p, stop)
+    return left
+
+
+def _path_totals(matrix, route, metrics):
+    """Other metrics summed along the roads the vehicle actually drives (the matrix's leg paths)."""
+    csr = matrix.csr
+    ids = [csr.index[n] for n in matrix.expand_route(route)]
+    return {m: csr.path_cost(ids, m) for m in metrics}
+
+
+CONSTRUCTIONS = ("savings", "sweep")
+
+
+# ---------------- Improvement ---------------- #
+
+def _improve_intra(fleet, deadline):
+    """2-opt / Or-opt inside each route, keeping a change only if the shift limit still holds."""
+    for k, route in enumerate(fleet.routes):
+        if len(route) < 3:
+            continue
+        order = [0] + route + [0]
+        while time.perf_counter() < deadline:
+            improved = two_opt(fleet.rows, order, deadline)
+            improved = or_opt(fleet.rows, order, deadline) or improved
+            if not improved:
+                break
+        candidate = order[1:-1]
+        if fleet.duration(candidate) <= fleet.max_time + 1e-9:
+            fleet.routes[k] = candidate
+
+
+def _relocate(fleet, deadline):
+    """Move single stops to the cheapest feasible position in another route."""
+    rows, trows = fleet.rows, fleet.time_rows
+    loads = [fleet.load(r) for r in fleet.routes]
+    durations = [fleet.duration(r) for r in fleet.routes]
+    improved = False
+
+    for a, route_a in enumerate(fleet.routes):
+        p = 0
+        while p < len(route_a):
+            u = route_a[p]
+            prev_u = route_a[p - 1] if p > 0 else 0
+            next_u = route_a[p + 1] if p + 1 < len(route_a) else 0
+            gain = rows[prev_u][u] + rows[u][next_u] - rows[prev_u][next_u]
+            time_gain = trows[prev_u][u] + trows[u][next_u] - trows[prev_u][next_u] + fleet.service_time
+
+            best = None
+            best_delta = -1e-9
+            for b, route_b in enumerate(fleet.routes):
+                if b == a or loads[b] + fleet.demand[u] > fleet.capacity:
+                    continue
+                full = [0] + route_b + [0]
+                for q in range(len(full) - 1):
+                    x, y = full[q], full[q + 1]
+                    delta = rows[x][u] + rows[u][y] - rows[x][y] - gain
+                    if delta >= best_delta:
+                        continue
+                    extra = trows[x][u] + trows[u][y] - trows[x][y] + fleet.service_time
+                    if durations[b] + extra > fleet.max_time + 1e-9:
+                        continue
+                    best, best_delta = (b, q, extra), delta
+
+            if best is None:
+                p += 1
+                continue
+            b, q, extra = best
+            del route_a[p]
+            fleet.routes[b].insert(q, u)
+            loads[a] -= fleet.demand[u]
+            loads[b] += fleet.demand[u]
+            durations[a] -= time_gain
+            durations[b] += extra
+            improved = True
+            if time.perf_counter() > deadline:
+                break
+        if time.perf_counter() > deadline:
+            break
+
+    fleet.routes = [r for r in fleet.routes if r]
+    return improved
+
+
+def _swap(fleet, deadline):
+    """Exchange one stop between two routes when it lowers the total cost."""
+    rows = fleet.rows
+    improved = False
+    n = len(fleet.routes)
+    for a in range(n):
+        for b in range(a + 1, n):
+            ra, rb = fleet.routes[a], fleet.routes[b]
+            for p in range(len(ra)):
+                for q in range(len(rb)):
+                    u, v = ra[p], rb[q]
+                    pa = ra[p - 1] if p > 0 else 0
+                    na = ra[p + 1] if p + 1 < len(ra) else 0
+                    pb = rb[q - 1] if q > 0 else 0
+                    nb = rb[q + 1] if q + 1 < len(rb) else 0
+                    delta = (rows[pa][v] + rows[v][na] - rows[pa][u] - rows[u][na]
+                             + rows[pb][u] + rows[u][nb] - rows[pb][v] - rows[v][nb])
+                    if delta >= -1e-9:
+                        continue
+                    ra[p], rb[q] = v, u
+                    if fleet.feasible(ra) and fleet.feasible(rb):
+                        improved = True
+                    else:
+                        ra[p], rb[q] = u, v
+            if time.perf_counter() > deadline:
+                return improved
+    return improved
+
+
+# ---------------- Public API ---------------- #
+
+def solve_vrp(depot, stops, num_vehicles=None, capacity=None, demands=None, max_shift_time=None,
+              weight_type="distance", service_time=0.0, construction="savings", time_budget=2.0,
+              filename=DEFAULT_GRAPH_FILE):
+    """
+    Capacitated multi-vehicle routing from one depot.
+    Every vehicle starts and ends at `depot`, carries at most `capacity`
+    units of demand (`demands` maps stop → units, default 1 each) and its
+    route must fit into `max_shift_time` minutes of the `time` metric,
+    including `service_time` per stop. Routes minimise `weight_type`.
+
+    Stops are grouped with savings or sweep construction, then improved with
+    intra-route 2-opt/Or-opt and inter-route relocate/swap moves until no move
+    helps or `time_budget` seconds pass. If that needs more than
+    `num_vehicles` routes, the routes carrying the most demand are kept and
+    the other stops are inserted into them where they still fit. Pair costs
+    come from cached distance matrices for `weight_type` and time only;
+    the other metrics are summed along the matrix's leg paths.
+
+    Returns a dict with per-vehicle routes (location names, depot at both
+    ends, plus load and totals per metric), overall totals and any stops
+    that could not be served (unreachable, over capacity, or no vehicle left).
+    """
+    if construction not in CONSTRUCTIONS:
+        raise ValueError(f"Unknown construction '{construction}', expected one of {CONSTRUCTIONS}")
+
+    deadline = time.perf_counter() + time_budget
+    demands = demands or {}
+    names = [depot] + [s for s in dict.fromkeys(stops) if s != depot]
+    matrices = {m: distance_matrix(names, m, filename=filename) for m in dict.fromkeys((weight_type, "time"))}
+    rows = matrices[weight_type].rows()
+    time_rows = matrices["time"].rows()
+
+    demand = [0] + [demands.get(s, 1) for s in names[1:]]
+    fleet = _Fleet(rows, time_rows, demand, capacity, max_shift_time, service_time)
+
+    customers, unassigned = [], []
+    for i in range(1, len(names)):
+        if math.isinf(rows[0][i]) or math.isinf(rows[i][0]) or not fleet.feasible([i]):
+            unassigned.append(names[i])
+        else:
+            customers.append(i)
+
+    if construction == "savings":
+        fleet.routes = _savings_routes(fleet, customers)
+    else:
+        fleet.routes = _sweep_routes(fleet, customers, get_csr(filename), names)
+
+    while time.perf_counter() < deadline:
+        _improve_intra(fleet, deadline)
+        improved = _relocate(fleet, deadline)
+        improved = _swap(fleet, deadline) or improved
+        if not improved:
+            break
+    _improve_intra(fleet, deadline)
+
+    # Not enough vehicles: keep the routes that carry the most demand and
+    # squeeze the rest into them where capacity and shift time allow.
+    fleet.routes.sort(key=fleet.load, reverse=True)
+    if num_vehicles is not None and len(fleet.routes) > num_vehicles:
+        dropped = [i for route in fleet.routes[num_vehicles:] for i in route]
+        fleet.routes = fleet.routes[:num_vehicles]
+        unassigned.extend(names[i] for i in _insert_dropped(fleet, dropped))
+        _improve_intra(fleet, deadline)
+
+    others = [m for m in METRICS if m not in matrices]
+    totals = {m: 0.0 for m in METRICS}
+    vehicles = []
+    for k, route in enumerate(fleet.routes):
+        order = [0] + route + [0]
+        entry = {"vehicle": k, "route": [names[i] for i in order], "load": fleet.load(route)}
+        for m, matrix in matrices.items():
+            entry[m] = tour_cost(matrix.rows(), order)
+        if others:
+            entry.update(_path_totals(matrices[weight_type], entry["route"], others))
+        for m in METRICS:
+            totals[m] += entry[m]
+        entry["shift_time"] = fleet.duration(route)
+        vehicles.append(entry)
+
+    return {
+        "routes": vehicles,
+        "totals": totals,
+        "cost": totals[weight_type],
+        "unassigned": unassigned,
+    }
+
+
+if __name__ == "__main__":
+    depot = "Master Canteen Square"
+    stops = [
+        "Ram Mandir Square", "Acharya Vihar", "Jayadev Vihar", "KIIT Square",
+        "Infocity", "Airport (BPI)", "Lingaraj Temple", "Baramunda",
+        "Mancheswar", "Palasuni", "Patia Big Bazaar", "CRP Square",
+    ]
+
+    result = solve_vrp(depot, stops, num_vehicles=3, capacity=5, max_shift_time=60)
+    print("🚚 Fleet plan:")
+    for vehicle in result["routes"]:
+        print(f"  Vehicle {vehicle['vehicle']} (load {vehicle['load']}): " + " → ".join(vehicle["route"]))
+        print(f"    distance {vehicle['distance']:.2f} km | time {vehicle['time']:.2f} min | fuel {vehicle['fuel_cost']:.2f} L")
+    print(f"Total distance: {result['totals']['distance']:.2f}")
+    if result["unassigned"]:
+        print(f"⚠️ Unassigned: {', '.join(result['unassigned'])}")
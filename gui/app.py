@@ -1,23 +1,22 @@
 import streamlit as st
-import json, os, sys, folium
+import os, sys, folium
 from streamlit_folium import st_folium
 
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from algorithms.dijkstra import find_optimal_route
+from algorithms.pareto import pareto_routes
 from algorithms.tsp_solver import solve_tsp
-from rl_agent.environment import DeliveryRouteEnv
-from rl_agent.agent import QLearningAgent
+from algorithms.graph_store import get_graph
+from rl_agent.goal_agent import GoalConditionedAgent
 
 
 # ---------------- Helper Functions ---------------- #
 
 def load_graph():
-    """Load Bhubaneswar graph."""
-    path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "bhubaneswar_graph.json")
-    with open(path, "r") as f:
-        return json.load(f)
+    """Load Bhubaneswar graph (shared, reloaded only when the file changes)."""
+    return get_graph()
 
 def get_center(graph):
     """Get map center coordinates."""
@@ -99,6 +98,8 @@ if "info" not in st.session_state:
     st.session_state.info = ""
 if "map_html" not in st.session_state:
     st.session_state.map_html = None
+if "alternatives" not in st.session_state:
+    st.session_state.alternatives = []
 
 st.divider()
 
@@ -106,9 +107,17 @@ st.divider()
 
 if mode == "Graph Algorithm":
     st.subheader("📈 Shortest Path (Dijkstra Algorithm)")
+    show_tradeoffs = st.checkbox("Show trade-offs across distance, time and fuel (one Pareto search)")
     if st.button("Find Route"):
+        st.session_state.alternatives = []
         with st.spinner("Calculating optimal route..."):
-            total, path = find_optimal_route(start, target, weight_type=metric)
+            if show_tradeoffs:
+                alternatives = pareto_routes(start, target, max_labels_per_node=64)
+                # the selected metric's best route is shown first
+                alternatives.sort(key=lambda r: r[metric])
+                total, path = (alternatives[0][metric], alternatives[0]["path"]) if alternatives else (0, [])
+            else:
+                total, path = find_optimal_route(start, target, weight_type=metric)
 
         if not path or len(path) < 2:
             st.error("⚠️ No valid route found between these locations.")
@@ -118,10 +127,27 @@ if mode == "Graph Algorithm":
             st.session_state.path = path
             st.session_state.info = f"Total {metric}: {total:.2f}"
             st.session_state.map_html = generate_map_html(graph, path)
+            if show_tradeoffs:
+                st.session_state.alternatives = alternatives
+
+    if st.session_state.alternatives:
+        alternatives = st.session_state.alternatives
+        st.markdown(f"**{len(alternatives)} Pareto-optimal alternatives** (none is beaten on all three metrics):")
+        st.table([
+            {"#": i + 1, "distance (km)": round(r["distance"], 2), "time (min)": round(r["time"], 2),
+             "fuel_cost": round(r["fuel_cost"], 2), "stops": len(r["path"])}
+            for i, r in enumerate(alternatives)
+        ])
+        choice = st.selectbox("Show alternative", range(1, len(alternatives) + 1))
+        chosen = alternatives[choice - 1]
+        if chosen["path"] != st.session_state.path:
+            st.session_state.path = chosen["path"]
+            st.session_state.info = " • ".join(f"{m}: {chosen[m]:.2f}" for m in ("distance", "time", "fuel_cost"))
+            st.session_state.map_html = generate_map_html(graph, chosen["path"])
 
 elif mode == "Multi-Delivery (TSP)":
     st.subheader("🗺️ Multi-Stop Route Optimization")
-    stops = st.multiselect("Select delivery stops (2–6 recommended)", locations)
+    stops = st.multiselect("Select delivery stops (up to 16 solved exactly)", locations)
     if st.button("Compute Optimal Route"):
         if len(stops) < 2:
             st.warning("Please select at least 2 stops.")
@@ -138,25 +164,24 @@ elif mode == "Multi-Delivery (TSP)":
 
 elif mode == "Reinforcement Learning":
     st.subheader("🧠 AI Route Optimization (Q-Learning)")
-    episodes = st.slider("Training Episodes", 100, 3000, 1000, 100)
+    episodes = st.slider("Training Episodes per Destination", 100, 3000, 1000, 100)
+    model_file = f"models/goal_q_table_{metric}"
     if st.button("Train RL Agent"):
-        with st.spinner("Training RL agent... please wait ⏳"):
-            env = DeliveryRouteEnv(start, target, weight_type=metric)
-            agent = QLearningAgent(env)
-            agent.learn(episodes)
-            agent.save()
-        st.success(f"🤖 Trained for {episodes} episodes and saved!")
+        with st.spinner("Training RL agent for every destination... please wait ⏳"):
+            agent = GoalConditionedAgent(weight_type=metric)
+            agent.learn(episodes_per_target=episodes)
+            agent.save(model_file)
+        st.success(f"🤖 Trained for {episodes} episodes per destination and saved!")
 
     if st.button("Use Trained RL Agent"):
-        if not os.path.exists("models/q_table.pkl"):
-            st.error("❌ No trained model found. Train first.")
+        if not os.path.exists(model_file):
+            st.error(f"❌ No trained model for '{metric}' found. Train first.")
         else:
             with st.spinner("Predicting optimal route..."):
-                env = DeliveryRouteEnv(start, target, weight_type=metric)
-                agent = QLearningAgent(env)
-                agent.load()
+                # One goal-conditioned model answers any start/destination pair.
+                agent = GoalConditionedAgent.load(model_file)
                 path, cost = agent.get_optimal_route(start, target)
-            if not path:
+            if not path or path[-1] != target:
                 st.error("⚠️ RL agent could not find a route.")
             else:
                 st.success("🚀 RL Agent Predicted Route Successfully!")
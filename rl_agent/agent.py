@@ -2,7 +2,10 @@ import random
 import pickle
 import os
 from collections import defaultdict
+from utils import instrumentation
 from .environment import DeliveryRouteEnv
+from .batch_trainer import BatchQTrainer
+from .q_store import MappedQTable, load_q_model, save_q_model, slot_layout, table_to_array
 
 
 class QLearningAgent:
@@ -33,7 +36,7 @@ class QLearningAgent:
         best_actions = [a for a, q in zip(actions, q_values) if q == max_q]
         return random.choice(best_actions)
 
-    def learn(self, episodes=1000):
+    def learn(self, episodes=1000, verbose=True):
         """Train the agent for multiple episodes."""
         for ep in range(episodes):
             state = self.env.reset()
@@ -58,23 +61,69 @@ class QLearningAgent:
                 state = next_state
                 total_reward += reward
 
-            if (ep + 1) % 100 == 0:
+            if instrumentation.ENABLED:
+                instrumentation.inc("rl.episodes")
+                instrumentation.observe("rl.episode_steps", self.env.steps)
+            if verbose and (ep + 1) % 100 == 0:
                 print(f"Episode {ep+1}/{episodes} | Total Reward: {total_reward:.2f}")
 
-        print("✅ Training complete!")
-
-    def save(self, filename="models/q_table.pkl"):
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        with open(filename, "wb") as f:
-            pickle.dump(dict(self.Q), f)
+        if verbose:
+            print("✅ Training complete!")
+
+    def learn_batch(self, episodes=1000, num_envs=64, seed=None):
+        """Train with the vectorised NumPy trainer (many episodes in lockstep)."""
+        trainer = BatchQTrainer(
+            self.env.csr, self.env.weight_type,
+            alpha=self.alpha, gamma=self.gamma, epsilon=self.epsilon,
+            num_envs=num_envs, seed=seed,
+        )
+        trainer.train(self.env.start, self.env.target, episodes, max_steps=self.env.max_steps)
+        self.Q = defaultdict(float, trainer.q_table())
+        print(f"✅ Training complete! ({episodes} episodes, {num_envs} parallel envs)")
+
+    def learn_parallel(self, episodes=1000, workers=4, sync_every=100, seed=0):
+        """Train episode shards in worker processes and average them into this Q-table."""
+        # imported here because the parallel trainer builds agents itself
+        from .parallel_trainer import ParallelQTrainer
+        trainer = ParallelQTrainer(
+            self.env.start, self.env.target, self.env.weight_type,
+            alpha=self.alpha, gamma=self.gamma, epsilon=self.epsilon,
+            workers=workers, sync_every=sync_every,
+        )
+        self.Q = trainer.train(episodes, seed=seed, initial=self.Q)
+        print(f"✅ Training complete! ({trainer.stats['episodes_per_sec']:.0f} episodes/s on {workers} workers)")
+
+    def save(self, filename="models/q_table"):
+        """
+        Save the Q-table as a memory-mappable model directory (see q_store).
+        A filename ending in .pkl still writes the legacy pickle.
+        """
+        if filename.endswith(".pkl"):
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            with open(filename, "wb") as f:
+                pickle.dump(dict(self.Q.items()), f)
+        else:
+            next_node, cost = slot_layout(self.env.csr, self.env.weight_type)
+            Q, _ = table_to_array(self.Q, self.env.csr.names, next_node)
+            save_q_model(filename, self.env.csr.names, next_node, cost, Q, self.env.weight_type)
         print(f"💾 Q-table saved at {filename}")
 
-    def load(self, filename="models/q_table.pkl"):
-        if not os.path.exists(filename):
-            raise FileNotFoundError(f"No saved Q-table found at {filename}")
-        with open(filename, "rb") as f:
-            data = pickle.load(f)
-        self.Q = defaultdict(float, data)
+    def load(self, filename="models/q_table", mmap_mode="r"):
+        """
+        Load a model directory without unpickling; Q-values stay memory-mapped.
+        The default read-only mapping is enough for get_optimal_route; pass
+        mmap_mode="r+" or None to keep training on the loaded table.
+        Legacy .pkl files are still accepted (convert them with q_store).
+        """
+        if filename.endswith(".pkl"):
+            if not os.path.exists(filename):
+                raise FileNotFoundError(f"No saved Q-table found at {filename}")
+            with open(filename, "rb") as f:
+                data = pickle.load(f)
+            self.Q = defaultdict(float, data)
+        else:
+            meta, Q, next_node, _ = load_q_model(filename, mmap_mode=mmap_mode)
+            self.Q = MappedQTable(meta["names"], next_node, Q)
         print(f"✅ Q-table loaded from {filename}")
 
     def get_optimal_route(self, start, target):
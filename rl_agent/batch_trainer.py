@@ -0,0 +1,124 @@
+import numpy as np
+from algorithms.graph_store import get_csr
+from utils import instrumentation
+from .q_store import slot_layout
+
+
+class BatchQTrainer:
+    """
+    NumPy-backed Q-learning trainer.
+    Q is a dense (num_nodes, max_degree) array indexed by node id and
+    neighbour slot; `num_envs` delivery episodes are stepped in lockstep as
+    vectorised array operations. Rewards and the update rule are the same as
+    QLearningAgent.learn, except that arriving at the target is terminal (no
+    bootstrapped future value). With gamma < 1 an endless loop over cheap
+    roads is bounded by cost / (1 - gamma) and can still look better than a
+    long trip to the target; gamma = 1.0 learns the true route costs.
+    """
+
+    def __init__(self, csr, weight_type="distance", alpha=0.3, gamma=0.9, epsilon=0.2, num_envs=64, seed=None):
+        self.csr = csr
+        self.weight_type = weight_type
+        self.alpha = alpha
+        self.gamma = gamma
+        self.epsilon = epsilon
+        self.num_envs = num_envs
+        self.rng = np.random.default_rng(seed)
+
+        n = csr.num_nodes
+        self.degree = np.diff(csr.offsets).astype(np.int64)
+        # Neighbour id and travel cost per (node, slot); -1 / inf where unused.
+        next_node, self.cost = slot_layout(csr, weight_type)
+        self.next_node = next_node.astype(np.int64)
+        self.valid = next_node >= 0
+        width = next_node.shape[1]
+
+        self.Q = np.zeros((n, width), dtype=np.float64)
+
+    def _greedy(self, nodes):
+        """Best slot per node, breaking ties uniformly at random."""
+        q = np.where(self.valid[nodes], self.Q[nodes], -np.inf)
+        best = q == q.max(axis=1, keepdims=True)
+        return np.argmax(self.rng.random(best.shape) * best, axis=1)
+
+    def _starts(self, start, target, count):
+        if start is not None:
+            return np.full(count, start, dtype=np.int64)
+        # exploring starts: any node except the target
+        n = self.csr.num_nodes
+        picks = self.rng.integers(0, n - 1, size=count)
+        return picks + (picks >= target)
+
+    def train(self, start, target, episodes=1000, max_steps=None):
+        """
+        Run `episodes` episodes to `target` across the batch of environments.
+        `start=None` begins every episode at a random node (exploring starts).
+        """
+        s = self.csr.index[start] if start is not None else None
+        t = self.csr.index[target]
+        max_steps = max_steps or self.csr.num_nodes * 2
+        batch = min(self.num_envs, episodes)
+
+        record = instrumentation.ENABLED
+        current = self._starts(s, t, batch)
+        steps = np.zeros(batch, dtype=np.int64)
+        active = np.ones(batch, dtype=bool)
+        started = batch
+
+        while active.any():
+            env = np.flatnonzero(active)
+            nodes = current[env]
+            stuck = self.degree[nodes] == 0
+            if stuck.any():
+                active[env[stuck]] = False
+                env, nodes = env[~stuck], nodes[~stuck]
+                if not len(env):
+                    continue
+
+            # epsilon-greedy over neighbour slots
+            explore = self.rng.random(len(env)) < self.epsilon
+            slot = self._greedy(nodes)
+            random_slot = (self.rng.random(len(env)) * self.degree[nodes]).astype(np.int64)
+            slot = np.where(explore, random_slot, slot)
+
+            nxt = self.next_node[nodes, slot]
+            reward = -self.cost[nodes, slot]
+            arrived = nxt == t
+
+            next_q = np.where(self.valid[nxt], self.Q[nxt], -np.inf).max(axis=1)
+            next_q = np.where(np.isfinite(next_q), next_q, 0.0)
+            future = np.where(arrived, 0.0, self.gamma * next_q)
+
+            # Q-learning update (if two envs hit the same pair, the last write wins)
+            self.Q[nodes, slot] = (1 - self.alpha) * self.Q[nodes, slot] + self.alpha * (reward + future)
+
+            current[env] = nxt
+            steps[env] += 1
+            finished = env[arrived | (steps[env] >= max_steps)]
+            for e in finished:
+                if record:
+                    instrumentation.inc("rl.episodes")
+                    instrumentation.observe("rl.episode_steps", int(steps[e]))
+                if started < episodes:
+                    current[e] = self._starts(s, t, 1)[0]
+                    steps[e] = 0
+                    started += 1
+                else:
+                    active[e] = False
+
+        return self.Q
+
+    def q_table(self):
+        """Export as the {(state_name, action_name): value} dict QLearningAgent uses."""
+        names = self.csr.names
+        table = {}
+        for u, k in zip(*np.nonzero(self.valid)):
+            table[(names[u], names[self.next_node[u, k]])] = float(self.Q[u, k])
+        return table
+
+
+def train_batch(start, target, weight_type="distance", episodes=1000, csr=None, **kwargs):
+    """Train on the shared graph and return the Q-table dict."""
+    trainer = BatchQTrainer(csr or get_csr(), weight_type, **kwargs)
+    trainer.train(start, target, episodes)
+    return trainer.q_table()
@@ -1,8 +1,6 @@
-import json
-import os
 import random
-import math
-from algorithms.dijkstra import load_city_graph, build_adjacency_list
+import numbers
+from algorithms.graph_store import get_graph, get_adjacency, get_csr
 
 
 class DeliveryRouteEnv:
@@ -11,16 +9,53 @@ class DeliveryRouteEnv:
     Each episode = one delivery trip from start to destination.
     """
 
-    def __init__(self, start, target, weight_type="distance"):
-        self.graph = load_city_graph()
-        self.adjacency = build_adjacency_list(self.graph, weight_type=weight_type)
-        self.locations = list(self.graph["locations"].keys())
+    def __init__(self, start, target, weight_type="distance", csr=None):
+        # Pass a CSRGraph to run on the compact representation instead of
+        # the name-keyed adjacency dict.
+        if csr is not None:
+            self.graph = None
+            self.csr = csr
+            self.adjacency = csr.adjacency_view(weight_type)
+            self.locations = list(csr.names)
+        else:
+            self.graph = get_graph()
+            self.csr = get_csr()
+            self.adjacency = get_adjacency(weight_type)
+            self.locations = list(self.graph["locations"].keys())
         self.start = start
         self.target = target
         self.current = start
         self.weight_type = weight_type
         self.max_steps = len(self.locations) * 2
         self.steps = 0
+        self._build_transitions()
+
+    def _build_transitions(self):
+        """
+        Precompute everything step() needs so the hot loop only does dict lookups.
+        neighbours[node] is a tuple of neighbour names; transitions[(node, nb)]
+        is (cost, reward, info). The same tables exist keyed by integer id.
+        Info dicts are shared between steps and must not be mutated.
+        """
+        self.index = {name: i for i, name in enumerate(self.locations)}
+        self.neighbours = {}
+        self.transitions = {}
+        self.neighbour_ids = [()] * len(self.locations)
+        self.transition_ids = {}
+
+        for node in self.locations:
+            edges = self.adjacency.get(node) or []
+            self.neighbours[node] = tuple(n for n, _ in edges)
+            u = self.index[node]
+            self.neighbour_ids[u] = tuple(self.index[n] for n, _ in edges)
+            for n, weight in edges:
+                # keep the first road between a pair, like the old linear scan did
+                if (node, n) not in self.transitions:
+                    entry = (weight, -weight, {"cost": weight})
+                    self.transitions[(node, n)] = entry
+                    self.transition_ids[(u, self.index[n])] = entry
+
+    _INVALID = (-10, {"error": "Invalid move"})
 
     def reset(self):
         """Reset environment to start a new episode."""
@@ -32,31 +67,51 @@ class DeliveryRouteEnv:
         """
         Take one step in the environment.
         Args:
-            action: the next location name (must be a neighbor)
+            action: the next location name (must be a neighbor), or its integer id
         Returns:
-            next_state, reward, done, info
+            next_state, reward, done, info (next_state is an id if action was one)
         """
-        self.steps += 1
+        if isinstance(action, numbers.Integral):
+            return self.step_id(action)
 
-        if action not in [n for n, _ in self.adjacency[self.current]]:
+        self.steps += 1
+        transition = self.transitions.get((self.current, action))
+        if transition is None:
             # Invalid action → penalty
-            reward = -10
-            done = False
-            info = {"error": "Invalid move"}
-            return self.current, reward, done, info
-
-        # Cost to move
-        cost = next(weight for n, weight in self.adjacency[self.current] if n == action)
-        reward = -cost  # less distance/time/fuel = higher reward
+            reward, info = self._INVALID
+            return self.current, reward, False, info
+
+        _, reward, info = transition  # reward = -cost: less distance/time/fuel = higher reward
         self.current = action
+        done = action == self.target or self.steps >= self.max_steps
+        return action, reward, done, info
+
+    def reset_id(self):
+        """reset() for the integer-id API: returns the start node id."""
+        self.reset()
+        return self.index[self.current]
 
+    def step_id(self, action):
+        """step() for the integer-id API: `action` and the returned state are node ids."""
+        self.steps += 1
+        u = self.index[self.current]
+        transition = self.transition_ids.get((u, action))
+        if transition is None:
+            reward, info = self._INVALID
+            return u, reward, False, info
+
+        _, reward, info = transition
+        self.current = self.locations[action]
         done = self.current == self.target or self.steps >= self.max_steps
-        info = {"cost": cost}
-        return self.current, reward, done, info
+        return action, reward, done, info
 
     def get_valid_actions(self):
-        """Return all valid neighboring locations."""
-        return [n for n, _ in self.adjacency[self.current]]
+        """Return all valid neighboring locations (a shared tuple, do not mutate)."""
+        return self.neighbours[self.current]
+
+    def get_valid_action_ids(self):
+        """Return the ids of all valid neighboring locations."""
+        return self.neighbour_ids[self.index[self.current]]
 
     def render(self):
         """Optional: print current location (for debugging)."""
@@ -0,0 +1,129 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from algorithms.graph_store import get_csr
+from .batch_trainer import BatchQTrainer
+from .q_store import load_q_model, save_q_model
+
+DEFAULT_MODEL_FILE = "models/goal_q_table"
+
+_worker = {}
+
+
+def _init_worker(csr, weight_type, params):
+    _worker["csr"] = csr
+    _worker["weight_type"] = weight_type
+    _worker["params"] = params
+
+
+def _train_target(job):
+    """Train the Q-slice for one target (runs in a worker process or inline)."""
+    target, episodes, seed = job
+    trainer = BatchQTrainer(_worker["csr"], _worker["weight_type"], seed=seed, **_worker["params"])
+    trainer.train(None, target, episodes)
+    return trainer.Q.astype(np.float32)
+
+
+class GoalConditionedAgent:
+    """
+    Q-learning agent whose state is (current location, target).
+    Q has shape (num_targets, num_nodes, max_degree): one slice per target,
+    indexed by node id and neighbour slot like BatchQTrainer. Each slice is
+    trained with exploring starts, so one model answers every start/target
+    pair without retraining. Saved models are memory-mapped on load, so only
+    the slices for the requested targets are ever read from disk.
+    """
+
+    # Road transitions are deterministic, so a full-step update (alpha=1) is
+    # safe and converges far faster than the 0.3 used by QLearningAgent.
+    def __init__(self, weight_type="distance", csr=None, alpha=1.0, gamma=1.0, epsilon=0.2, num_envs=64):
+        self.csr = csr if csr is not None else get_csr()
+        self.weight_type = weight_type
+        self.params = {"alpha": alpha, "gamma": gamma, "epsilon": epsilon, "num_envs": num_envs}
+
+        layout = BatchQTrainer(self.csr, weight_type, **self.params)
+        self.names = list(self.csr.names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.next_node = layout.next_node.astype(np.int32)  # same slot layout as q_store
+        self.cost = layout.cost
+        self.valid = layout.valid
+        self.targets = []
+        self.target_pos = {}
+        self.Q = None
+
+    def learn(self, episodes_per_target=1000, targets=None, workers=1, seed=0):
+        """
+        Train one Q-slice per target (all locations by default).
+        With workers > 1 the targets are trained in parallel processes.
+        """
+        targets = list(targets) if targets is not None else list(self.names)
+        jobs = [(t, episodes_per_target, seed + i) for i, t in enumerate(targets)]
+
+        if workers > 1:
+            with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                     initargs=(self.csr, self.weight_type, self.params)) as pool:
+                slices = list(pool.map(_train_target, jobs))
+        else:
+            _init_worker(self.csr, self.weight_type, self.params)
+            slices = [_train_target(job) for job in jobs]
+
+        self.targets = targets
+        self.target_pos = {t: i for i, t in enumerate(targets)}
+        self.Q = np.stack(slices) if slices else None
+        print(f"✅ Goal-conditioned training complete! ({len(targets)} targets)")
+
+    def save(self, filename=DEFAULT_MODEL_FILE):
+        save_q_model(filename, self.names, self.next_node, self.cost, self.Q, self.weight_type, self.targets)
+        print(f"💾 Goal-conditioned Q-table saved at {filename}")
+
+    @classmethod
+    def load(cls, filename=DEFAULT_MODEL_FILE, mmap_mode="r"):
+        """Load a saved model; no graph file or training environment is needed."""
+        meta, Q, next_node, cost = load_q_model(filename, mmap_mode=mmap_mode)
+        agent = cls.__new__(cls)
+        agent.weight_type = meta["weight_type"]
+        agent.names = meta["names"]
+        agent.targets = meta["targets"] or []
+        agent.next_node = next_node
+        agent.cost = cost
+        agent.Q = Q
+        agent.csr = None
+        agent.params = {}
+        agent.index = {name: i for i, name in enumerate(agent.names)}
+        agent.target_pos = {t: i for i, t in enumerate(agent.targets)}
+        agent.valid = np.asarray(next_node) >= 0
+        print(f"✅ Goal-conditioned Q-table loaded from {filename}")
+        return agent
+
+    def get_optimal_route(self, start, target):
+        """Follow the learned policy greedily. Returns (path, cost) like QLearningAgent."""
+        if target not in self.target_pos:
+            raise KeyError(f"Model was not trained for target '{target}'")
+        q = self.Q[self.target_pos[target]]
+        node, goal = self.index[start], self.index[target]
+        path = [start]
+        cost = 0.0
+
+        for _ in range(len(self.names) * 2):
+            if node == goal:
+                break
+            row = np.where(self.valid[node], q[node], -np.inf)
+            if not np.isfinite(row).any():
+                break
+            slot = int(np.argmax(row))
+            cost += float(self.cost[node, slot])
+            node = int(self.next_node[node, slot])
+            path.append(self.names[node])
+
+        return path, cost
+
+
+if __name__ == "__main__":
+    agent = GoalConditionedAgent(weight_type="distance")
+    agent.learn(episodes_per_target=1000)
+    agent.save()
+
+    model = GoalConditionedAgent.load()
+    for start, target in [("Master Canteen Square", "KIIT Square"), ("Airport (BPI)", "Mancheswar")]:
+        path, total_cost = model.get_optimal_route(start, target)
+        print(f"🚚 {start} → {target}: " + " → ".join(path))
+        print(f"Total Distance: {total_cost:.2f}")
@@ -0,0 +1,151 @@
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from algorithms.graph_store import get_csr
+from .agent import QLearningAgent
+from .environment import DeliveryRouteEnv
+from .q_store import MappedQTable, slot_layout, table_to_array
+
+_worker = {}
+
+
+class _SharedQ(dict):
+    """
+    A worker's Q-table for one round: entries are read from the master's
+    memory-mapped array the first time they are touched and written
+    locally, so only touched entries ever live in the worker.
+    """
+
+    def __init__(self, master):
+        super().__init__()
+        self.master = master
+
+    def __missing__(self, key):
+        value = self[key] = self.master.get(key, 0.0)
+        return value
+
+
+def _init_worker(start, target, weight_type, alpha, gamma, epsilon):
+    """Each worker process builds its own environment, agent and slot layout once."""
+    env = DeliveryRouteEnv(start, target, weight_type=weight_type)
+    _worker["agent"] = QLearningAgent(env, alpha=alpha, gamma=gamma, epsilon=epsilon)
+    _worker["next_node"], _ = slot_layout(env.csr, weight_type)
+
+
+def _run_shard(job):
+    """
+    Run one shard of episodes from the master table file; return the
+    entries it changed as (flat indices into the Q array, new values).
+    """
+    master_file, episodes, seed = job
+    agent = _worker["agent"]
+    master = MappedQTable(agent.env.csr.names, _worker["next_node"], np.load(master_file, mmap_mode="r"))
+    agent.Q = _SharedQ(master)
+    random.seed(seed)
+    agent.learn(episodes, verbose=False)
+
+    width = master.Q.shape[1]
+    changed = []
+    for key, value in agent.Q.items():
+        u, slot = master.position(key)
+        if slot is not None and value != master.Q[u, slot]:
+            changed.append((u * width + slot, value))
+    index = np.array([i for i, _ in changed], dtype=np.int64)
+    return index, np.array([v for _, v in changed], dtype=np.float64)
+
+
+class ParallelQTrainer:
+    """
+    Data-parallel Q-learning over a ProcessPoolExecutor.
+    Training runs in rounds: every worker starts from the same master
+    Q-table, plays `sync_every` episodes in its own DeliveryRouteEnv, and
+    sends back the entries it changed. The master then sets every touched
+    entry to the average over workers (a worker that did not touch an entry
+    contributes the master value). The master table is a dense (node, slot)
+    array in a memory-mapped .npy (the q_store layout) that workers map
+    read-only, so each round ships only the changed entries between
+    processes, never the whole table. Shard seeds depend only on the run
+    seed, round and worker slot, and results are merged in slot order, so a
+    given seed always produces the same table.
+    """
+
+    def __init__(self, start, target, weight_type="distance", alpha=0.3, gamma=0.9, epsilon=0.2,
+                 workers=4, sync_every=100):
+        self.start = start
+        self.target = target
+        self.weight_type = weight_type
+        self.alpha = alpha
+        self.gamma = gamma
+        self.epsilon = epsilon
+        self.workers = workers
+        self.sync_every = sync_every
+        self.stats = {}
+
+    @staticmethod
+    def merge(master, updates):
+        """Average worker updates, given as (flat indices, values), into the master array in place."""
+        flat = master.reshape(-1)
+        total = np.zeros(flat.shape, dtype=np.float64)
+        count = np.zeros(flat.shape, dtype=np.int64)
+        for index, values in updates:
+            np.add.at(total, index, values)
+            np.add.at(count, index, 1)
+        touched = np.flatnonzero(count)
+        flat[touched] = (total[touched] + (len(updates) - count[touched]) * flat[touched]) / len(updates)
+        return master
+
+    def train(self, episodes=1000, seed=0, initial=None):
+        """
+        Train for `episodes` episodes in total and return the merged Q-table as a defaultdict.
+        `initial` is any (state, action) -> value mapping with items(), e.g. a
+        defaultdict or the MappedQTable that QLearningAgent.load returns.
+        """
+        csr = get_csr()
+        next_node, _ = slot_layout(csr, self.weight_type)
+        initial_q, _ = table_to_array(initial if initial is not None else {}, csr.names, next_node,
+                                      dtype=np.float64)
+        begin = time.perf_counter()
+        done = 0
+        round_no = 0
+
+        with tempfile.TemporaryDirectory() as folder, ProcessPoolExecutor(
+            self.workers,
+            initializer=_init_worker,
+            initargs=(self.start, self.target, self.weight_type, self.alpha, self.gamma, self.epsilon),
+        ) as pool:
+            master_file = os.path.join(folder, "master.npy")
+            master = np.lib.format.open_memmap(master_file, mode="w+", dtype=np.float64, shape=next_node.shape)
+            master[:] = initial_q
+            master.flush()
+            while done < episodes:
+                jobs = []
+                for slot in range(self.workers):
+                    shard = min(self.sync_every, episodes - done - slot * self.sync_every)
+                    if shard <= 0:
+                        break
+                    jobs.append((master_file, shard, f"{seed}:{round_no}:{slot}"))
+                updates = list(pool.map(_run_shard, jobs))
+                self.merge(master, updates)
+                master.flush()
+                done += sum(job[1] for job in jobs)
+                round_no += 1
+            q = np.array(master)
+            del master  # unmap before the folder is removed
+
+        seconds = time.perf_counter() - begin
+        self.stats = {
+            "episodes": done,
+            "rounds": round_no,
+            "seconds": seconds,
+            "episodes_per_sec": done / seconds if seconds else float("inf"),
+        }
+
+        names = csr.names
+        rows, slots = np.nonzero((next_node >= 0) & (q != 0))
+        return defaultdict(float, {
+            (names[u], names[next_node[u, k]]): float(q[u, k]) for u, k in zip(rows.tolist(), slots.tolist())
+        })
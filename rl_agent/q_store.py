@@ -0,0 +1,149 @@
+import json
+import os
+import pickle
+import numpy as np
+
+FORMAT_VERSION = 1
+
+# A saved model is a directory:
+#   meta.json      format version, metric, node names (index = node id), targets
+#   q.npy          float32 Q-values, (num_nodes, max_degree) or (num_targets, num_nodes, max_degree)
+#   next_node.npy  int32 neighbour id per (node, slot), -1 for unused slots
+#   cost.npy       float64 arc cost per (node, slot), inf for unused slots
+# The .npy files are opened with mmap_mode, so loading reads only the header
+# and pages are pulled in as the policy touches them.
+
+
+def slot_layout(csr, weight_type="distance"):
+    """(next_node, cost) arrays giving each node's neighbours in CSR slot order."""
+    degree = np.diff(csr.offsets)
+    width = max(int(degree.max()) if csr.num_nodes else 0, 1)
+    slots = np.arange(width)
+    valid = slots[None, :] < degree[:, None]
+    arc = np.where(valid, csr.offsets[:-1, None] + slots[None, :], 0)
+    next_node = np.where(valid, csr.targets[arc], -1).astype(np.int32)
+    cost = np.where(valid, csr.metric_column(weight_type)[arc], np.inf)
+    return next_node, cost
+
+
+def save_q_model(dirname, names, next_node, cost, Q, weight_type, targets=None):
+    os.makedirs(dirname, exist_ok=True)
+    np.save(os.path.join(dirname, "q.npy"), np.asarray(Q, dtype=np.float32))
+    np.save(os.path.join(dirname, "next_node.npy"), np.asarray(next_node, dtype=np.int32))
+    np.save(os.path.join(dirname, "cost.npy"), np.asarray(cost, dtype=np.float64))
+    meta = {
+        "format": FORMAT_VERSION,
+        "weight_type": weight_type,
+        "names": list(names),
+        "targets": list(targets) if targets is not None else None,
+    }
+    with open(os.path.join(dirname, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+
+def load_q_model(dirname, mmap_mode="r"):
+    """Return (meta, Q, next_node, cost); arrays are memory-mapped unless mmap_mode is None."""
+    meta_path = os.path.join(dirname, "meta.json")
+    if not os.path.exists(meta_path):
+        raise FileNotFoundError(f"No saved Q-table found at {dirname}")
+    with open(meta_path, "r") as f:
+        meta = json.load(f)
+    if meta.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported Q-table format {meta.get('format')} in {dirname}")
+    Q = np.load(os.path.join(dirname, "q.npy"), mmap_mode=mmap_mode)
+    next_node = np.load(os.path.join(dirname, "next_node.npy"), mmap_mode=mmap_mode)
+    cost = np.load(os.path.join(dirname, "cost.npy"), mmap_mode=mmap_mode)
+    return meta, Q, next_node, cost
+
+
+class MappedQTable:
+    """
+    Dict-like view over a dense (node, slot) Q array, keyed by
+    (state_name, action_name) like QLearningAgent.Q. Missing pairs read as
+    0.0 (as with the old defaultdict). Writes go into the array, so open
+    the model with mmap_mode="r+" or None if you want to keep training.
+    """
+
+    def __init__(self, names, next_node, Q):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.next_node = next_node
+        self.Q = Q
+
+    def position(self, key):
+        """(node id, slot) of a (state, action) pair in the Q array; slot is None if it is not a road."""
+        state, action = key
+        u = self.index.get(state)
+        v = self.index.get(action)
+        if u is None or v is None:
+            return None, None
+        hits = np.flatnonzero(self.next_node[u] == v)
+        return u, (int(hits[0]) if len(hits) else None)
+
+    def __getitem__(self, key):
+        u, slot = self.position(key)
+        return 0.0 if slot is None else float(self.Q[u, slot])
+
+    def get(self, key, default=0.0):
+        u, slot = self.position(key)
+        return default if slot is None else float(self.Q[u, slot])
+
+    def __setitem__(self, key, value):
+        u, slot = self.position(key)
+        if slot is None:
+            raise KeyError(f"{key} is not a road in this model")
+        self.Q[u, slot] = value
+
+    def __contains__(self, key):
+        return self.position(key)[1] is not None
+
+    def items(self):
+        names = self.names
+        for u, k in zip(*np.nonzero(self.next_node >= 0)):
+            yield (names[u], names[self.next_node[u, k]]), float(self.Q[u, k])
+
+    def __len__(self):
+        return int(np.count_nonzero(self.next_node >= 0))
+
+
+def table_to_array(table, names, next_node, dtype=np.float32):
+    """Dense Q array from a {(state, action): value} dict; pairs that are not roads are dropped."""
+    index = {name: i for i, name in enumerate(names)}
+    slot_of = {}
+    for u, k in zip(*np.nonzero(next_node >= 0)):
+        slot_of.setdefault((int(u), int(next_node[u, k])), int(k))
+
+    Q = np.zeros(next_node.shape, dtype=dtype)
+    dropped = 0
+    for (state, action), value in table.items():
+        slot = slot_of.get((index.get(state), index.get(action)))
+        if slot is None:
+            dropped += 1
+            continue
+        Q[index[state], slot] = value
+    return Q, dropped
+
+
+def convert_pickle(pickle_path, dirname, csr, weight_type="distance"):
+    """
+    One-off converter from the legacy pickled defaultdict to the array format.
+    Only run it on pickles you produced yourself: unpickling can execute code.
+    Returns the number of entries that did not match a road and were dropped.
+    """
+    with open(pickle_path, "rb") as f:
+        table = pickle.load(f)
+    next_node, cost = slot_layout(csr, weight_type)
+    Q, dropped = table_to_array(table, csr.names, next_node)
+    save_q_model(dirname, csr.names, next_node, cost, Q, weight_type)
+    return dropped
+
+
+if __name__ == "__main__":
+    import sys
+    from algorithms.graph_store import get_csr
+
+    src = sys.argv[1] if len(sys.argv) > 1 else "models/q_table.pkl"
+    dst = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(src)[0]
+    metric = sys.argv[3] if len(sys.argv) > 3 else "distance"
+    dropped = convert_pickle(src, dst, get_csr(), metric)
+    print(f"✅ Converted {src} → {dst}/ ({dropped} entries dropped)")
@@ -0,0 +1,27 @@
+import io
+from algorithms.batch_router import read_orders, route_orders
+
+ORDERS = "\n".join([
+    '{"order_id": "a", "start": "Master Canteen Square", "end": "KIIT Square"}',
+    'not json',
+    '{"order_id": "c", "start": ["x"], "end": "Infocity"}',
+    '{"order_id": "d", "start": "Infocity", "end": {"name": "KIIT Square"}}',
+    '["a list"]',
+    '{"order_id": "f", "start": "Nowhere", "end": "Infocity"}',
+    '{"order_id": "g", "start": "KIIT Square", "end": "Infocity", "metric": "time"}',
+])
+
+
+def test_malformed_orders_become_error_rows():
+    stats = {}
+    results = list(route_orders(read_orders(io.StringIO(ORDERS), fmt="jsonl"), stats=stats))
+
+    assert len(results) == 7
+    assert [r["order_id"] for r in results] == ["a", 2, "c", "d", 5, "f", "g"]
+    ok = {r["order_id"]: r for r in results if not r.get("error")}
+    assert set(ok) == {"a", "g"}
+    assert ok["a"]["cost"] > 0 and ok["a"]["path"][0] == "Master Canteen Square"
+    for result in results:
+        if result["order_id"] not in ok:
+            assert result["cost"] is None and result["error"]
+    assert stats["errors"] == 5
@@ -0,0 +1,91 @@
+import math
+import os
+import pytest
+from algorithms.contraction_hierarchy import (
+    ContractionHierarchy, build_ch, ch_file, ch_query, ch_search, get_ch, preprocess, verify_against_dijkstra,
+)
+from algorithms.csr_graph import CSRGraph
+from algorithms.dijkstra import dijkstra_csr, find_optimal_route
+from algorithms.graph_store import get_store
+from utils.graph_generator import generate_synthetic_city, save_synthetic_city
+from utils.graph_io import load_graph_arrays
+
+
+@pytest.fixture(scope="module")
+def city(tmp_path_factory):
+    graph_file = str(tmp_path_factory.mktemp("ch") / "city.npz")
+    save_synthetic_city(generate_synthetic_city(400, seed=11), graph_file)
+    return graph_file
+
+
+@pytest.mark.parametrize("weight_type", ["distance", "time", "fuel_cost"])
+@pytest.mark.parametrize("core_degree", [math.inf, 6, 0])
+def test_queries_match_dijkstra(city, weight_type, core_degree):
+    csr = get_store(city).csr()
+    ch = build_ch(csr, weight_type, core_degree=core_degree)
+    if core_degree == 0:
+        assert ch.core_size == csr.num_nodes  # nothing contracted: the query is a plain bidirectional search
+    assert verify_against_dijkstra(csr, ch, samples=300, seed=7) == []
+
+
+def test_paths_are_real_roads(city):
+    csr = get_store(city).csr()
+    ch = build_ch(csr, "distance", core_degree=6)
+    for source, target in [(0, 399), (17, 250), (123, 5)]:
+        cost, path = ch_query(ch, csr, source, target)
+        assert path[0] == source and path[-1] == target
+        assert cost == pytest.approx(dijkstra_csr(csr, source, target)[0])
+        assert all(math.isfinite(csr.arc_weight(a, b)) for a, b in zip(path, path[1:]))
+
+
+def test_save_and_load(city, tmp_path):
+    csr = get_store(city).csr()
+    ch = build_ch(csr, "time", core_degree=6)
+    ch.save(tmp_path / "ch.npz")
+    loaded = ContractionHierarchy.load(tmp_path / "ch.npz")
+    assert loaded.core_size == ch.core_size
+    assert verify_against_dijkstra(csr, loaded, samples=100) == []
+
+
+def test_queries_never_build_a_hierarchy(tmp_path):
+    graph_file = str(tmp_path / "small.npz")
+    save_synthetic_city(generate_synthetic_city(200, seed=3), graph_file)
+    store = get_store(graph_file)
+    csr = store.csr()
+    start, end = csr.names[0], csr.names[150]
+    expected, _ = find_optimal_route(start, end, method="dijkstra", filename=graph_file, cache=False)
+
+    # Not preprocessed: "ch" answers through bidirectional A* and writes nothing.
+    assert get_ch("distance", graph_file) is None
+    cost, path = find_optimal_route(start, end, method="ch", filename=graph_file, cache=False)
+    assert cost == pytest.approx(expected) and path[0] == start and path[-1] == end
+    assert not os.path.exists(ch_file("distance", graph_file))
+
+    preprocess(graph_file, metrics=("distance",))
+    assert get_ch("distance", graph_file) is not None
+
+    # A weight update makes the hierarchy stale until it is preprocessed again.
+    u = csr.index[path[0]]
+    v = csr.index[path[1]]
+    store.update_edge_weights([(path[0], path[1], "distance", csr.arc_weight(u, v) * 10)])
+    assert get_ch("distance", graph_file) is None
+    expected, _ = find_optimal_route(start, end, method="dijkstra", filename=graph_file, cache=False)
+    cost, _ = find_optimal_route(start, end, method="ch", filename=graph_file, cache=False)
+    assert cost == pytest.approx(expected)
+
+    preprocess(graph_file, metrics=("distance",))
+    ch = get_ch("distance", graph_file)
+    assert ch is not None
+    assert verify_against_dijkstra(csr, ch, samples=100) == []
+
+
+def test_graph_without_a_store_never_uses_another_files_hierarchy(city, monkeypatch):
+    def no_hierarchy(*args, **kwargs):
+        raise AssertionError("a CSRGraph without a store must not look up any hierarchy")
+
+    monkeypatch.setattr("algorithms.contraction_hierarchy.get_ch", no_hierarchy)
+    csr = CSRGraph.from_graph_arrays(load_graph_arrays(city))
+    for source, target in [(0, 399), (42, 7)]:
+        cost, path = ch_search(csr, source, target)
+        assert cost == pytest.approx(dijkstra_csr(csr, source, target)[0])
+        assert path[0] == source and path[-1] == target
@@ -0,0 +1,32 @@
+import random
+import pytest
+from algorithms.distance_matrix import distance_matrix
+from algorithms.graph_store import get_store
+from utils.graph_generator import generate_synthetic_city, save_synthetic_city
+
+
+@pytest.fixture(scope="module")
+def city(tmp_path_factory):
+    graph_file = str(tmp_path_factory.mktemp("matrix") / "city.npz")
+    save_synthetic_city(generate_synthetic_city(500, seed=4), graph_file)
+    return graph_file
+
+
+@pytest.mark.parametrize("weight_type", ["distance", "time"])
+def test_compact_matrix_matches_full_trees(city, weight_type):
+    csr = get_store(city).csr()
+    stops = random.Random(2).sample(csr.names, 12)
+    compact = distance_matrix(stops, weight_type, filename=city)
+    full = distance_matrix(stops, weight_type, filename=city, repairable=True)
+    assert compact.dists is None and full.dists is not None
+    assert compact.matrix == pytest.approx(full.matrix)
+
+    # Paths come from the kept stop trees in both directions and cost what the matrix says.
+    for a in stops:
+        for b in stops:
+            path = compact.path(a, b)
+            assert path[0] == a and path[-1] == b
+            assert csr.path_cost([csr.index[n] for n in path], weight_type) == pytest.approx(compact.cost(a, b))
+
+    route = compact.expand_route(stops)
+    assert csr.path_cost([csr.index[n] for n in route], weight_type) == pytest.approx(compact.route_cost(stops))
@@ -0,0 +1,24 @@
+import numpy as np
+from rl_agent.parallel_trainer import ParallelQTrainer
+
+
+def test_merge_averages_touched_entries_against_the_master_value():
+    master = np.array([[1.0, 2.0], [3.0, 4.0]])
+    updates = [
+        (np.array([0, 3]), np.array([5.0, 8.0])),
+        (np.array([0]), np.array([7.0])),
+    ]
+    ParallelQTrainer.merge(master, updates)
+
+    # entry 0 touched by both workers, entry 3 by one (the other keeps 4.0), the rest untouched
+    assert master.tolist() == [[6.0, 2.0], [3.0, 6.0]]
+
+
+def test_training_is_reproducible_and_keeps_the_initial_table():
+    trainer = ParallelQTrainer("Master Canteen Square", "KIIT Square", workers=2, sync_every=25)
+    first = trainer.train(100, seed=3)
+    assert trainer.stats["episodes"] == 100 and trainer.stats["rounds"] == 2
+    assert dict(trainer.train(100, seed=3)) == dict(first)
+
+    continued = trainer.train(0, seed=3, initial=first)
+    assert dict(continued) == dict(first)
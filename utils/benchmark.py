@@ -0,0 +1,268 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Add project root to path (this file is also run as a script)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from algorithms.dijkstra import find_optimal_route
+from algorithms.graph_store import DEFAULT_GRAPH_FILE, GraphStore, get_csr, resolve_graph_path
+from algorithms.tsp_solver import plan_tour
+from rl_agent.agent import QLearningAgent
+from rl_agent.batch_trainer import BatchQTrainer
+from rl_agent.environment import DeliveryRouteEnv
+from utils.graph_generator import generate_synthetic_city, save_synthetic_city
+from utils.graph_io import convert_graph
+
+DEFAULT_SIZES = (1_000, 10_000)
+P2P_METHODS = ("dijkstra", "astar", "bidirectional")
+TSP_STOPS = (4, 8, 12, 16, 24)
+RL_MAX_NODES = 2_000
+
+# Single-shot timings (graph load, RL training) are the median of this many runs.
+TIMING_REPEATS = 5
+# Timer and scheduler noise: a timing only regresses if it also got slower by
+# more than this, so sub-millisecond results are never flagged.
+# Latency summaries are checked on their median only: means and tails swing
+# with scheduler noise far more than a 20 % threshold allows.
+MIN_COMPARABLE_MS = 1.0
+UNCHECKED_KEYS = ("mean_ms", "p90_ms", "p99_ms", "max_ms")
+
+
+def _summary(samples_ms):
+    a = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "count": int(len(a)),
+        "mean_ms": float(a.mean()),
+        "p50_ms": float(np.percentile(a, 50)),
+        "p90_ms": float(np.percentile(a, 90)),
+        "p99_ms": float(np.percentile(a, 99)),
+        "max_ms": float(a.max()),
+    }
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+
+
+def _median_seconds(run, repeats=TIMING_REPEATS):
+    """Median wall time of `repeats` calls of run()."""
+    samples = []
+    for _ in range(repeats):
+        begin = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - begin)
+    return float(np.median(samples))
+
+
+def bench_load(graph_file):
+    """Time (median, untraced) and peak traced memory to go from a graph file to a ready CSRGraph."""
+    seconds = _median_seconds(lambda: GraphStore(graph_file).csr())  # fresh store: nothing cached
+    tracemalloc.start()
+    csr = GraphStore(graph_file).csr()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "load_s": seconds,
+        "peak_traced_mb": peak / 1024 / 1024,
+        "csr_mb": csr.nbytes() / 1024 / 1024,
+        "file_mb": os.path.getsize(resolve_graph_path(graph_file)) / 1024 / 1024,
+    }
+
+
+def bench_p2p(graph_file, pairs, methods=P2P_METHODS, seed=0):
+    """Latency percentiles of uncached point-to-point queries per routing method."""
+    csr = get_csr(graph_file)
+    rng = random.Random(seed)
+    queries = [tuple(rng.sample(csr.names, 2)) for _ in range(pairs)]
+    results = {}
+    for method in methods:
+        find_optimal_route(*queries[0], method=method, filename=graph_file, cache=False)  # warm-up
+        samples = []
+        for start, end in queries:
+            begin = time.perf_counter()
+            find_optimal_route(start, end, method=method, filename=graph_file, cache=False)
+            samples.append((time.perf_counter() - begin) * 1000)
+        results[method] = _summary(samples)
+    return results
+
+
+def bench_tsp(graph_file, stop_counts=TSP_STOPS, repeats=3, time_budget=1.0, seed=0):
+    """Solve time (matrix + tour) against number of stops."""
+    csr = get_csr(graph_file)
+    rng = random.Random(seed)
+    results = {}
+    for n in stop_counts:
+        if n > csr.num_nodes:
+            break
+        samples, methods = [], set()
+        for _ in range(repeats):
+            stops = rng.sample(csr.names, n)
+            begin = time.perf_counter()
+            result = plan_tour(stops, time_budget=time_budget, filename=graph_file, cache=False)
+            samples.append((time.perf_counter() - begin) * 1000)
+            methods.add(result["method"])
+        results[str(n)] = dict(_summary(samples), methods=sorted(methods))
+    return results
+
+
+def bench_rl(graph_file, episodes=500, seed=0, tabular=False):
+    """Training throughput in episodes per second (median of fresh runs)."""
+    csr = get_csr(graph_file)
+    rng = random.Random(seed)
+    start, target = rng.sample(csr.names, 2)
+    results = {}
+
+    def train_batch():
+        BatchQTrainer(csr, "distance", gamma=1.0, seed=seed).train(start, target, episodes)
+
+    seconds = _median_seconds(train_batch)
+    results["batch"] = {"episodes": episodes, "seconds_s": seconds, "episodes_per_s": episodes / seconds}
+
+    if tabular:
+        def train_tabular():
+            random.seed(seed)
+            QLearningAgent(DeliveryRouteEnv(start, target, csr=csr)).learn(episodes, verbose=False)
+
+        seconds = _median_seconds(train_tabular)
+        results["tabular"] = {"episodes": episodes, "seconds_s": seconds, "episodes_per_s": episodes / seconds}
+    return results
+
+
+def bench_graph(name, graph_file, args, tabular_rl=False):
+    print(f"⏱️  {name}: load", flush=True)
+    result = {"nodes": get_csr(graph_file).num_nodes, "load": {}}
+    # Load time for both on-disk formats of the same graph.
+    ext = os.path.splitext(graph_file)[1]
+    other = tempfile.NamedTemporaryFile(suffix=".json" if ext == ".npz" else ".npz", delete=False).name
+    try:
+        convert_graph(resolve_graph_path(graph_file), other)
+        result["load"][ext.lstrip(".")] = bench_load(graph_file)
+        result["load"][os.path.splitext(other)[1].lstrip(".")] = bench_load(other)
+    finally:
+        os.remove(other)
+
+    print(f"⏱️  {name}: point-to-point", flush=True)
+    result["p2p"] = bench_p2p(graph_file, args.pairs, seed=args.seed)
+    print(f"⏱️  {name}: TSP", flush=True)
+    result["tsp"] = bench_tsp(graph_file, args.stops, args.tsp_repeats, seed=args.seed)
+    if result["nodes"] <= args.rl_max_nodes:
+        print(f"⏱️  {name}: RL", flush=True)
+        result["rl"] = bench_rl(graph_file, args.episodes, seed=args.seed, tabular=tabular_rl)
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def run_suite(args):
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": args.seed,
+        },
+        "graphs": {},
+    }
+    report["graphs"]["bhubaneswar"] = bench_graph("bhubaneswar", DEFAULT_GRAPH_FILE, args, tabular_rl=True)
+
+    with tempfile.TemporaryDirectory() as folder:
+        for n in args.sizes:
+            graph_file = os.path.join(folder, f"synthetic_{n}.npz")
+            save_synthetic_city(generate_synthetic_city(n, seed=args.seed), graph_file)
+            report["graphs"][f"synthetic_{n}"] = bench_graph(f"synthetic_{n}", graph_file, args)
+    return report
+
+
+def _leaves(tree, prefix=()):
+    for key, value in tree.items():
+        if isinstance(value, dict):
+            yield from _leaves(value, prefix + (key,))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield prefix + (key,), value
+
+
+def compare(current, baseline, threshold=0.2):
+    """
+    Regressions of `current` against `baseline`, as readable strings.
+    Keys ending in _ms / _s / _mb are lower-is-better, _per_s higher-is-better
+    (unless a seconds_s next to it already covers the same run); anything
+    else (counts, sizes, means and tail latencies) is informational. A metric
+    regresses when it is more than `threshold` (0.2 = 20 %) worse than the
+    baseline, and a timing also needs to be more than MIN_COMPARABLE_MS slower.
+    """
+    base = dict(_leaves(baseline.get("graphs", {})))
+    regressions = []
+    for path, value in _leaves(current.get("graphs", {})):
+        old = base.get(path)
+        if old is None or value is None:
+            continue
+        key = path[-1]
+        if key in UNCHECKED_KEYS:
+            continue
+        if key.endswith("_per_s"):
+            if path[:-1] + ("seconds_s",) in base:
+                continue
+            worse = old > 0 and value < old * (1 - threshold)
+        elif key.endswith("_mb"):
+            worse = value > old * (1 + threshold)
+        elif key.endswith(("_ms", "_s")):
+            scale = 1.0 if key.endswith("_ms") else 1000.0
+            worse = value > old * (1 + threshold) and (value - old) * scale > MIN_COMPARABLE_MS
+        else:
+            continue
+        if worse:
+            regressions.append(f"{'/'.join(path)}: {old:.4g} → {value:.4g}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Routing / TSP / RL benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="*", default=list(DEFAULT_SIZES),
+                        help="synthetic city sizes (junctions)")
+    parser.add_argument("--pairs", type=int, default=200, help="point-to-point queries per method")
+    parser.add_argument("--stops", type=int, nargs="*", default=list(TSP_STOPS), help="TSP stop counts")
+    parser.add_argument("--tsp-repeats", type=int, default=3)
+    parser.add_argument("--episodes", type=int, default=500, help="RL training episodes")
+    parser.add_argument("--rl-max-nodes", type=int, default=RL_MAX_NODES, help="skip RL on larger graphs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_results.json", help="where to write the JSON report")
+    parser.add_argument("--baseline", help="earlier report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    report = run_suite(args)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Benchmark report written to {args.out}")
+
+    for name, result in report["graphs"].items():
+        p2p = result["p2p"]["dijkstra"]
+        print(f"📊 {name}: {result['nodes']} nodes | load {result['load']['npz']['load_s'] * 1000:.0f} ms (npz) | "
+              f"dijkstra p50 {p2p['p50_ms']:.2f} ms, p99 {p2p['p99_ms']:.2f} ms")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regressions over {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"✅ No regressions over {args.threshold:.0%} against {args.baseline}")
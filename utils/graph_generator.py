@@ -1,6 +1,55 @@
 import json
 import math
+import os
 import random
+import sys
+import numpy as np
+
+# Add project root to path (this file is also run as a script)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.graph_io import graph_to_arrays, is_binary_graph, save_graph_arrays
+
+# Synthetic cities grow outwards from Bhubaneswar's south-west corner.
+SYNTHETIC_ORIGIN = (85.75, 20.20)
+SYNTHETIC_BLOCK_DEG = 0.0015  # ~165 m between neighbouring junctions
+
+# Hourly speed multipliers (index 0 = 00:00-01:00) relative to a road's
+# free-flow speed; a road's travel time at a given hour scales by 1 / multiplier.
+SPEED_PROFILES = {
+    "arterial": (1.15, 1.15, 1.15, 1.15, 1.15, 1.1, 1.0, 0.75, 0.55, 0.6, 0.8, 0.85,
+                 0.8, 0.8, 0.85, 0.85, 0.7, 0.5, 0.5, 0.65, 0.85, 1.0, 1.1, 1.15),
+    "residential": (1.05, 1.05, 1.05, 1.05, 1.05, 1.05, 1.0, 0.9, 0.85, 0.9, 1.0, 1.0,
+                    1.0, 1.0, 1.0, 0.95, 0.9, 0.85, 0.85, 0.9, 1.0, 1.0, 1.05, 1.05),
+    "market": (1.1, 1.1, 1.1, 1.1, 1.1, 1.1, 1.05, 1.0, 0.9, 0.85, 0.7, 0.7,
+               0.7, 0.75, 0.85, 0.85, 0.75, 0.6, 0.6, 0.6, 0.65, 0.8, 1.0, 1.1),
+}
+# Share of roads per profile; the rest keep a constant speed all day.
+PROFILE_SHARES = {"arterial": 0.4, "residential": 0.3, "market": 0.15}
+
+
+def speed_profile_table():
+    """SPEED_PROFILES as a (num_profiles, 24) array, rows in PROFILE_SHARES order."""
+    return np.array([SPEED_PROFILES[name] for name in PROFILE_SHARES], dtype=np.float64)
+
+
+def pick_speed_profiles(num_roads, rng):
+    """Random profile row per road (-1 = constant speed), drawn with a NumPy Generator."""
+    shares = list(PROFILE_SHARES.values())
+    choices = np.arange(-1, len(shares), dtype=np.int32)
+    return rng.choice(choices, size=num_roads, p=[1 - sum(shares)] + shares).astype(np.int32)
+
+
+def add_speed_profiles(graph, seed=None):
+    """Give the roads of a graph dict hourly speed profiles (in place)."""
+    ids = pick_speed_profiles(len(graph["edges"]), np.random.default_rng(seed))
+    graph["speed_profiles"] = speed_profile_table().tolist()
+    for edge, p in zip(graph["edges"], ids.tolist()):
+        edge.pop("profile", None)
+        if p >= 0:
+            edge["profile"] = p
+    return graph
+
 
 def generate_bhubaneswar_graph():
     """Generate a realistic graph with Bhubaneswar landmarks"""
@@ -29,6 +78,7 @@ def generate_bhubaneswar_graph():
     }
 
     edges = []
+    seen = set()  # unordered pairs already connected
     names = list(locations.keys())
 
     # Connect each location to 3–5 nearby ones
@@ -46,12 +96,9 @@ def generate_bhubaneswar_graph():
         num_connections = random.randint(3, 5)
 
         for other_name, dist in distances[:num_connections]:
-            exists = any(
-                (e['from'] == loc_name and e['to'] == other_name) or
-                (e['from'] == other_name and e['to'] == loc_name)
-                for e in edges
-            )
-            if not exists:
+            pair = frozenset((loc_name, other_name))
+            if pair not in seen:
+                seen.add(pair)
                 distance = round(dist, 2)
                 speed = random.uniform(25, 55)
                 time = round(distance / speed * 60, 2)  # minutes
@@ -74,20 +121,197 @@ def generate_bhubaneswar_graph():
         }
     }
 
-    return graph
+    return add_speed_profiles(graph)
 
 
-def save_graph(graph, filename="data/bhubaneswar_graph.json"):
-    import os
-    os.makedirs("data", exist_ok=True)
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def _union(parent, a, b):
+    ra, rb = _find(parent, a), _find(parent, b)
+    if ra == rb:
+        return False
+    parent[max(ra, rb)] = min(ra, rb)
+    return True
+
+
+def generate_synthetic_city(num_nodes, seed=0, min_connections=3, max_connections=5, chunk_size=100_000):
+    """
+    Generate a large random city as column arrays (no per-node dicts).
+    Junctions sit on a jittered square grid, one per block, so a junction's
+    nearest neighbours are always within the surrounding 5x5 blocks; that
+    grid is the spatial index for the k-nearest search. Each junction is
+    joined to its 3-5 nearest (like generate_bhubaneswar_graph), duplicate
+    pairs are dropped, and grid-neighbour roads are added only where they
+    join two disconnected pieces, so the city is always connected.
+    Returns a dict with x, y, src, dst, distance, time, fuel_cost arrays,
+    plus the hourly speed profile table and a profile id per road.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(num_nodes)
+    width = max(int(math.ceil(math.sqrt(n))), 1)
+    ids = np.arange(n, dtype=np.int64)
+    col, row = ids % width, ids // width
+    x = SYNTHETIC_ORIGIN[0] + (col + rng.uniform(0.1, 0.9, n)) * SYNTHETIC_BLOCK_DEG
+    y = SYNTHETIC_ORIGIN[1] + (row + rng.uniform(0.1, 0.9, n)) * SYNTHETIC_BLOCK_DEG
+    wanted = rng.integers(min_connections, max_connections + 1, n)
+
+    offsets = np.array([(dx, dy) for dy in range(-2, 3) for dx in range(-2, 3) if dx or dy])
+    k = min(max_connections, len(offsets))
+    src_parts, dst_parts = [], []
+    for lo in range(0, n, chunk_size):
+        hi = min(lo + chunk_size, n)
+        c = col[lo:hi, None] + offsets[:, 0]
+        r = row[lo:hi, None] + offsets[:, 1]
+        cand = r * width + c
+        ok = (c >= 0) & (c < width) & (r >= 0) & (cand < n)
+        cand = np.where(ok, cand, 0)
+        d = np.hypot(x[cand] - x[lo:hi, None], y[cand] - y[lo:hi, None])
+        d = np.where(ok, d, np.inf)
+        nearest = np.argsort(d, axis=1)[:, :k]
+        picked_d = np.take_along_axis(d, nearest, axis=1)
+        keep = (np.arange(k) < wanted[lo:hi, None]) & np.isfinite(picked_d)
+        rows_idx = np.nonzero(keep)[0]
+        src_parts.append(rows_idx + lo)
+        dst_parts.append(np.take_along_axis(cand, nearest, axis=1)[keep])
+
+    src = np.concatenate(src_parts) if src_parts else np.empty(0, dtype=np.int64)
+    dst = np.concatenate(dst_parts) if dst_parts else np.empty(0, dtype=np.int64)
+    # Edge dedup: each unordered pair is one key in a set.
+    lo_id, hi_id = np.minimum(src, dst), np.maximum(src, dst)
+    pairs = np.unique(lo_id * n + hi_id)
+    src, dst = pairs // n, pairs % n
+
+    # Connectivity: union the k-nearest roads, then add grid-neighbour
+    # roads (along each row, and down the first column) only where they
+    # join two separate components.
+    parent = list(range(n))
+    for a, b in zip(src.tolist(), dst.tolist()):
+        _union(parent, a, b)
+    extra = []
+    for i in range(1, n):
+        j = i - 1 if i % width else i - width
+        if _union(parent, i, j):
+            extra.append((j, i))
+    if extra:
+        extra = np.array(extra, dtype=np.int64)
+        src = np.concatenate([src, extra[:, 0]])
+        dst = np.concatenate([dst, extra[:, 1]])
+
+    # Same road model as generate_bhubaneswar_graph; 0.01 floor keeps
+    # very short blocks from rounding to free roads.
+    distance = np.maximum(np.round(np.hypot(x[src] - x[dst], y[src] - y[dst]) * 111, 2), 0.01)
+    speed = rng.uniform(25, 55, len(src))
+    time = np.maximum(np.round(distance / speed * 60, 2), 0.01)
+    fuel_cost = np.maximum(np.round(distance * rng.uniform(0.08, 0.15, len(src)), 2), 0.01)
+    profile_ids = pick_speed_profiles(len(src), rng)
+
+    return {
+        "x": x, "y": y,
+        "src": src.astype(np.int32), "dst": dst.astype(np.int32),
+        "distance": distance, "time": time, "fuel_cost": fuel_cost,
+        "profiles": speed_profile_table(), "profile_ids": profile_ids,
+        "metadata": {
+            "num_locations": n,
+            "num_roads": int(len(src)),
+            "city": f"Synthetic-{n}",
+            "seed": seed,
+        },
+    }
+
+
+def synthetic_name(i):
+    return f"Node {i}"
+
+
+def save_synthetic_city(city, filename, chunk_size=50_000):
+    """
+    Save a generate_synthetic_city result. A .npz filename writes the
+    binary column format directly; otherwise graph JSON is streamed to disk
+    a chunk of locations/roads at a time, in the layout load_city_graph reads.
+    """
+    folder = os.path.dirname(filename)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    x, y, src, dst = city["x"], city["y"], city["src"], city["dst"]
+    n, m = len(x), len(src)
+
+    if is_binary_graph(filename):
+        save_graph_arrays({
+            "names": [synthetic_name(i) for i in range(n)], "x": x, "y": y, "src": src, "dst": dst,
+            "weights": np.column_stack([city["distance"], city["time"], city["fuel_cost"]]),
+            "metadata": city["metadata"],
+            "profiles": city.get("profiles"), "profile_ids": city.get("profile_ids"),
+        }, filename)
+    else:
+        _stream_city_json(city, filename, chunk_size)
+
+    print(f"✅ Synthetic city saved to {filename}")
+    print(f"📍 Locations: {n}")
+    print(f"🛣️  Roads: {m}")
+
+
+def _stream_city_json(city, filename, chunk_size):
+    x, y, src, dst = city["x"], city["y"], city["src"], city["dst"]
+    n, m = len(x), len(src)
     with open(filename, "w") as f:
-        json.dump(graph, f, indent=2)
+        f.write('{"locations": {')
+        for lo in range(0, n, chunk_size):
+            hi = min(lo + chunk_size, n)
+            f.write(("," if lo else "") + ",".join(
+                f'"{synthetic_name(i)}": {{"id": {i}, "x": {xi:.6f}, "y": {yi:.6f}}}'
+                for i, xi, yi in zip(range(lo, hi), x[lo:hi].tolist(), y[lo:hi].tolist())
+            ))
+        f.write('}, "edges": [')
+        profile_ids = city.get("profile_ids")
+        for lo in range(0, m, chunk_size):
+            hi = min(lo + chunk_size, m)
+            profiles = profile_ids[lo:hi].tolist() if profile_ids is not None else [-1] * (hi - lo)
+            f.write(("," if lo else "") + ",".join(
+                f'{{"from": "{synthetic_name(a)}", "to": "{synthetic_name(b)}", '
+                f'"distance": {d}, "time": {t}, "fuel_cost": {c}' + (f', "profile": {p}}}' if p >= 0 else "}")
+                for a, b, d, t, c, p in zip(
+                    src[lo:hi].tolist(), dst[lo:hi].tolist(), city["distance"][lo:hi].tolist(),
+                    city["time"][lo:hi].tolist(), city["fuel_cost"][lo:hi].tolist(), profiles,
+                )
+            ))
+        f.write('], "metadata": ' + json.dumps(city["metadata"]))
+        if city.get("profiles") is not None:
+            f.write(', "speed_profiles": ' + json.dumps(city["profiles"].tolist()))
+        f.write("}")
+
+
+def save_graph(graph, filename="data/bhubaneswar_graph.json"):
+    """Save as indented JSON, or as the binary column format when filename ends in .npz."""
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+    if is_binary_graph(filename):
+        save_graph_arrays(graph_to_arrays(graph), filename)
+    else:
+        with open(filename, "w") as f:
+            json.dump(graph, f, indent=2)
     print(f"✅ Bhubaneswar graph saved to {filename}")
     print(f"📍 Locations: {graph['metadata']['num_locations']}")
     print(f"🛣️  Roads: {graph['metadata']['num_roads']}")
 
 
 if __name__ == "__main__":
-    graph = generate_bhubaneswar_graph()
-    save_graph(graph)
-    print("🎉 Realistic Bhubaneswar dataset generated successfully!")
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a city road graph")
+    parser.add_argument("--nodes", type=int, help="generate a synthetic city with this many junctions")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="output file, .json or binary .npz (default: data/bhubaneswar_graph.json or data/synthetic_<nodes>.json)")
+    args = parser.parse_args()
+
+    if args.nodes:
+        city = generate_synthetic_city(args.nodes, seed=args.seed)
+        save_synthetic_city(city, args.out or f"data/synthetic_{args.nodes}.json")
+        print("🎉 Synthetic city generated successfully!")
+    else:
+        graph = generate_bhubaneswar_graph()
+        save_graph(graph, args.out or "data/bhubaneswar_graph.json")
+        print("🎉 Realistic Bhubaneswar dataset generated successfully!")
@@ -0,0 +1,200 @@
+import json
+import os
+import numpy as np
+
+METRICS = ("distance", "time", "fuel_cost")
+BINARY_EXTENSIONS = (".npz",)
+
+# Binary graph file (.npz, uncompressed), one array per column:
+#   names      unicode names, index = node id
+#   x, y       float64 lon / lat per node id
+#   src, dst   int32 node ids, one entry per undirected road
+#   weights    float64 (num_roads, 3) in METRICS order
+#   metadata   JSON string
+# and optionally, for time-dependent travel times:
+#   profiles     float64 (num_profiles, slices) speed multipliers over one day
+#   profile_ids  int32 profile row per road, -1 = constant speed
+# Profiles are shared rows, so their memory grows with the number of roads
+# only through the one int per road.
+# Files written by save_graph_arrays also carry the ready-built CSR (see
+# csr_arrays), which CSRGraph adopts as loaded instead of sorting again:
+#   offsets      int64 (num_nodes + 1) first arc of each node
+#   targets      int32 arc heads, arc_weights float64 (num_arcs, 3)
+#   arc_profile  int32 profile row per arc (only with profiles)
+# Arrays are stored uncompressed so loading is a straight read into NumPy
+# with no per-node or per-road Python objects.
+
+
+def is_binary_graph(filename):
+    return os.path.splitext(filename)[1].lower() in BINARY_EXTENSIONS
+
+
+def check_profiles(profiles, profile_ids, num_roads):
+    """
+    Reject speed profiles the time-dependent search cannot use: a multiplier
+    that is zero, negative or not finite (a zero would make a road
+    impassable for a whole slice and the travel time never finish), or a
+    road pointing at a profile row that does not exist.
+    """
+    if profiles.ndim != 2 or not profiles.shape[0] or not profiles.shape[1]:
+        raise ValueError(f"speed profiles must be a non-empty (profiles, slices) table, got shape {profiles.shape}")
+    bad = ~(np.isfinite(profiles) & (profiles > 0))
+    if bad.any():
+        row, col = np.argwhere(bad)[0].tolist()
+        raise ValueError(f"speed profile {row} has multiplier {profiles[row, col]} in slice {col}, "
+                         f"multipliers must be positive and finite")
+    if len(profile_ids) != num_roads:
+        raise ValueError(f"{len(profile_ids)} profile ids for {num_roads} roads")
+    if len(profile_ids) and (profile_ids.min() < -1 or profile_ids.max() >= len(profiles)):
+        raise ValueError(f"profile ids must be -1 or in [0, {len(profiles)}), "
+                         f"got range [{profile_ids.min()}, {profile_ids.max()}]")
+
+
+def graph_to_arrays(graph):
+    """Convert the JSON graph dict (locations + edges) to column arrays."""
+    locations = graph["locations"]
+    names = [None] * len(locations)
+    x = np.zeros(len(locations), dtype=np.float64)
+    y = np.zeros(len(locations), dtype=np.float64)
+    for name, data in locations.items():
+        i = data["id"]
+        names[i] = name
+        x[i] = data.get("x", 0.0)
+        y[i] = data.get("y", 0.0)
+    index = {name: i for i, name in enumerate(names)}
+
+    edges = graph["edges"]
+    src = np.fromiter((index[e["from"]] for e in edges), dtype=np.int32, count=len(edges))
+    dst = np.fromiter((index[e["to"]] for e in edges), dtype=np.int32, count=len(edges))
+    weights = np.array([[e[m] for m in METRICS] for e in edges], dtype=np.float64).reshape(len(edges), len(METRICS))
+    arrays = {
+        "names": names, "x": x, "y": y, "src": src, "dst": dst, "weights": weights,
+        "metadata": graph.get("metadata", {}),
+    }
+    if graph.get("speed_profiles"):
+        arrays["profiles"] = np.asarray(graph["speed_profiles"], dtype=np.float64)
+        arrays["profile_ids"] = np.fromiter((e.get("profile", -1) for e in edges), dtype=np.int32, count=len(edges))
+        check_profiles(arrays["profiles"], arrays["profile_ids"], len(edges))
+    return arrays
+
+
+def arrays_to_graph(arrays):
+    """Rebuild the JSON-style graph dict from column arrays."""
+    names = list(arrays["names"])
+    locations = {
+        name: {"id": i, "x": xi, "y": yi}
+        for i, (name, xi, yi) in enumerate(zip(names, arrays["x"].tolist(), arrays["y"].tolist()))
+    }
+    columns = [arrays["weights"][:, k].tolist() for k in range(len(METRICS))]
+    edges = [
+        {"from": names[a], "to": names[b], **dict(zip(METRICS, w))}
+        for a, b, *w in zip(arrays["src"].tolist(), arrays["dst"].tolist(), *columns)
+    ]
+    graph = {"locations": locations, "edges": edges, "metadata": dict(arrays.get("metadata") or {})}
+    if arrays.get("profiles") is not None:
+        graph["speed_profiles"] = arrays["profiles"].tolist()
+        for edge, p in zip(edges, arrays["profile_ids"].tolist()):
+            if p >= 0:
+                edge["profile"] = p
+    return graph
+
+
+def csr_arrays(num_nodes, src, dst, weights, profile_ids=None):
+    """
+    Directed CSR arrays for undirected roads: (offsets, targets, arc
+    weights, arc profile ids or None). Every road becomes two arcs, and a
+    stable sort keeps each node's neighbours in edge-list order, matching
+    what build_adjacency_list produces.
+    """
+    # Arc 2k is edge k forwards, arc 2k+1 is edge k backwards.
+    arc_src = np.stack([src, dst], axis=1).ravel()
+    arc_dst = np.stack([dst, src], axis=1).ravel().astype(np.int32)
+    order = np.argsort(arc_src, kind="stable")
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(arc_src, minlength=num_nodes), out=offsets[1:])
+    arc_w = np.ascontiguousarray(np.repeat(weights, 2, axis=0)[order])
+    arc_profile = None
+    if profile_ids is not None:
+        arc_profile = np.repeat(np.asarray(profile_ids, dtype=np.int32), 2)[order]
+    return offsets, arc_dst[order], arc_w, arc_profile
+
+
+def check_csr(offsets, targets, num_nodes):
+    """The offsets invariant a stored CSR must meet before it is used as is."""
+    if (len(offsets) != num_nodes + 1 or offsets[0] != 0 or offsets[-1] != len(targets)
+            or np.any(offsets[1:] < offsets[:-1])):
+        raise ValueError(f"stored CSR offsets do not describe {num_nodes} nodes and {len(targets)} arcs")
+
+
+def save_graph_arrays(arrays, filename):
+    folder = os.path.dirname(filename)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    columns = {
+        "names": np.asarray(arrays["names"], dtype=str),
+        "x": np.asarray(arrays["x"], dtype=np.float64),
+        "y": np.asarray(arrays["y"], dtype=np.float64),
+        "src": np.asarray(arrays["src"], dtype=np.int32),
+        "dst": np.asarray(arrays["dst"], dtype=np.int32),
+        "weights": np.asarray(arrays["weights"], dtype=np.float64).reshape(-1, len(METRICS)),
+        "metadata": np.array(json.dumps(arrays.get("metadata") or {})),
+    }
+    if arrays.get("profiles") is not None:
+        columns["profiles"] = np.asarray(arrays["profiles"], dtype=np.float64)
+        columns["profile_ids"] = np.asarray(arrays["profile_ids"], dtype=np.int32)
+    offsets, targets, arc_weights, arc_profile = csr_arrays(
+        len(columns["names"]), columns["src"], columns["dst"], columns["weights"], columns.get("profile_ids"))
+    columns.update(offsets=offsets, targets=targets, arc_weights=arc_weights)
+    if arc_profile is not None:
+        columns["arc_profile"] = arc_profile
+    with open(filename, "wb") as f:
+        np.savez(f, **columns)
+
+
+def load_graph_arrays(filepath):
+    """Read a binary graph file into column arrays (names as a list of str)."""
+    with np.load(filepath, allow_pickle=False) as data:
+        arrays = {
+            "names": data["names"].tolist(),
+            "x": data["x"],
+            "y": data["y"],
+            "src": data["src"],
+            "dst": data["dst"],
+            "weights": data["weights"],
+            "metadata": json.loads(str(data["metadata"])),
+        }
+        if "profiles" in data.files:
+            arrays["profiles"] = data["profiles"]
+            arrays["profile_ids"] = data["profile_ids"]
+            check_profiles(arrays["profiles"], arrays["profile_ids"], len(arrays["src"]))
+        if "offsets" in data.files:
+            arrays["offsets"] = data["offsets"]
+            arrays["targets"] = data["targets"]
+            arrays["arc_weights"] = data["arc_weights"]
+            arrays["arc_profile"] = data["arc_profile"] if "arc_profile" in data.files else None
+            check_csr(arrays["offsets"], arrays["targets"], len(arrays["names"]))
+        return arrays
+
+
+def convert_graph(src_file, dst_file):
+    """Convert between JSON and binary graph files (direction picked by extension)."""
+    if is_binary_graph(src_file):
+        graph = arrays_to_graph(load_graph_arrays(src_file))
+    else:
+        with open(src_file, "r") as f:
+            graph = json.load(f)
+
+    if is_binary_graph(dst_file):
+        save_graph_arrays(graph_to_arrays(graph), dst_file)
+    else:
+        with open(dst_file, "w") as f:
+            json.dump(graph, f, indent=2)
+
+
+if __name__ == "__main__":
+    import sys
+
+    src = sys.argv[1] if len(sys.argv) > 1 else "data/bhubaneswar_graph.json"
+    dst = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(src)[0] + ".npz"
+    convert_graph(src, dst)
+    print(f"✅ Converted {src} → {dst} ({os.path.getsize(src):,} → {os.path.getsize(dst):,} bytes)")
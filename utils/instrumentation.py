@@ -0,0 +1,170 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Instrumentation is off unless enabled here or with ROUTE_INSTRUMENTATION=1.
+# Hot code checks the module-level ENABLED flag once per query / episode
+# (never per node), so the disabled cost is a single attribute lookup.
+ENABLED = os.environ.get("ROUTE_INSTRUMENTATION", "") not in ("", "0")
+
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1_000, 2_000, 5_000, 10_000, 20_000, 50_000,
+                 100_000, 200_000, 500_000, 1_000_000)
+MS_BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1_000, 2_000, 5_000, 10_000)
+
+
+class Histogram:
+    """Fixed-bucket histogram with approximate percentiles."""
+
+    def __init__(self, buckets=COUNT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q):
+        """Upper edge of the bucket holding the q-th percentile (max for the overflow bucket)."""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for edge, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(edge, self.max)
+        return self.max
+
+    def snapshot(self):
+        labels = [f"<={b}" for b in self.buckets] + [f">{self.buckets[-1]}"]
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+_counters = {}
+_histograms = {}
+_lock = threading.Lock()
+
+
+def enable():
+    global ENABLED
+    ENABLED = True
+
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+
+def inc(name, value=1):
+    """Add to a counter (callers check ENABLED first on hot paths)."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name, value, buckets=COUNT_BUCKETS):
+    """Record one value in a histogram; names ending in _ms get millisecond buckets."""
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = Histogram(MS_BUCKETS if name.endswith("_ms") else buckets)
+        hist.observe(value)
+
+
+@contextmanager
+def _timed(name):
+    begin = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(f"stage.{name}_ms", (time.perf_counter() - begin) * 1000)
+
+
+_UNTIMED = nullcontext()  # reusable, so a disabled stage() allocates nothing
+
+
+def stage(name):
+    """`with stage("search"):` records the block's wall time under stage.search_ms."""
+    return _timed(name) if ENABLED else _UNTIMED
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def snapshot():
+    """Counters and histogram summaries as a JSON-friendly dict."""
+    with _lock:
+        return {
+            "counters": dict(sorted(_counters.items())),
+            "histograms": {name: h.snapshot() for name, h in sorted(_histograms.items())},
+        }
+
+
+def drain():
+    """Return the raw counters / histograms and reset them (for shipping out of a worker process)."""
+    with _lock:
+        state = {
+            "counters": dict(_counters),
+            "histograms": {name: (h.buckets, h.counts, h.count, h.total, h.max) for name, h in _histograms.items()},
+        }
+        _counters.clear()
+        _histograms.clear()
+    return state
+
+
+def merge(state):
+    """Add a drain() result from another process into this one."""
+    with _lock:
+        for name, value in state["counters"].items():
+            _counters[name] = _counters.get(name, 0) + value
+        for name, (buckets, counts, count, total, peak) in state["histograms"].items():
+            hist = _histograms.get(name)
+            if hist is None:
+                hist = _histograms[name] = Histogram(buckets)
+            hist.counts = [a + b for a, b in zip(hist.counts, counts)]
+            hist.count += count
+            hist.total += total
+            hist.max = max(hist.max, peak)
+
+
+def dump(filename):
+    with open(filename, "w") as f:
+        json.dump(snapshot(), f, indent=2)
+
+
+def prometheus_text(prefix="route_"):
+    """Counters and histograms in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        for name, value in sorted(_counters.items()):
+            metric = prefix + name.replace(".", "_")
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for name, hist in sorted(_histograms.items()):
+            metric = prefix + name.replace(".", "_")
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for edge, n in zip(hist.buckets, hist.counts):
+                cumulative += n
+                lines.append(f'{metric}_bucket{{le="{edge}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {hist.count}')
+            lines += [f"{metric}_sum {hist.total}", f"{metric}_count {hist.count}"]
+    return "\n".join(lines) + "\n"